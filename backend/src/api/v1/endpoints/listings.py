@@ -43,27 +43,32 @@ async def get_listings(
     logger.info(f"🔍 Location filters received - City: '{filters.city}' (type: {type(filters.city)}), Neighborhood: '{filters.neighborhood}' (type: {type(filters.neighborhood)})")
     
     try:
-        # Join with ListingMetadata to access is_active and neighborhood info
+        # Join with ListingMetadata to access is_active and neighborhood info. The is_active filter
+        # drops listings without metadata anyway, so these are inner joins.
         query = select(ListingModel).join(
             ListingMetadataModel, 
-            ListingModel.listing_id == ListingMetadataModel.listing_id,
-            isouter=True
-        ).join(
-            NeighborhoodModel,
-            ListingMetadataModel.neighborhood_id == NeighborhoodModel.id,
-            isouter=True
+            ListingModel.listing_id == ListingMetadataModel.listing_id
         )
         
         # Filter by active listings using ListingMetadata
         query = query.where(ListingMetadataModel.is_active == True)
         
+        # The neighborhood is only needed to filter by location
+        filter_by_city = bool(filters.city and filters.city.strip() != '')
+        filter_by_neighborhood = bool(filters.neighborhood and filters.neighborhood.strip() != '')
+        if filter_by_city or filter_by_neighborhood:
+            query = query.join(
+                NeighborhoodModel,
+                ListingMetadataModel.neighborhood_id == NeighborhoodModel.id
+            )
+        
         # Filter by city
-        if filters.city and filters.city.strip() != '':
+        if filter_by_city:
             logger.info(f"🏙️ Applying city filter: {filters.city}")
             query = query.where(NeighborhoodModel.city == filters.city)
             
         # Filter by neighborhood name
-        if filters.neighborhood and filters.neighborhood.strip() != '':
+        if filter_by_neighborhood:
             logger.info(f"🏘️ Applying neighborhood filter: {filters.neighborhood}")
             query = query.where(NeighborhoodModel.hebrew_name == filters.neighborhood)
         
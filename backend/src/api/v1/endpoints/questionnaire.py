@@ -8,7 +8,7 @@ from src.middleware.auth import get_current_user
 from src.database.models import User as UserModel
 from src.database.schemas import QuestionModel
 from src.database.postgresql_db import get_db
-from src.services.questionnaire_service import QuestionnaireService
+from src.services.questionnaire_service import QuestionnaireService, normalize_answers
 from src.database.mongo_db import get_mongo_db
 from pydantic import BaseModel
 
@@ -246,6 +246,7 @@ async def update_user_questionnaire_responses(
             # Add to answered questions if not already there
             if question_id not in user_state['answered_questions']:
                 user_state['answered_questions'].append(question_id)
+        normalize_answers(user_state['answers'])
         
         logger.info(f"User {user_id}: After update, state has {len(user_state.get('answers', {}))} answers")
         
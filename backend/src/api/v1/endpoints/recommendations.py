@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 import logging
 from typing import List, Dict, Any
@@ -18,7 +19,8 @@ logger = logging.getLogger(__name__)
 @router.get(
     "/neighborhoods",
     summary="Get neighborhood recommendations",
-    description="Get personalized neighborhood recommendations based on user's questionnaire responses"
+    description="Get personalized neighborhood recommendations based on user's questionnaire responses",
+    response_class=ORJSONResponse
 )
 async def get_neighborhood_recommendations(
     top_k: int = Query(3, ge=1, le=10, description="Number of recommendations to return"),
@@ -2,7 +2,7 @@
 from sqlalchemy import (
     Column, Integer, String, Float, Boolean, ForeignKey, Enum as SQLEnum,
     DECIMAL, TEXT, BIGINT, TIMESTAMP, Table,
-    DateTime  
+    DateTime, Index, text
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -114,6 +114,10 @@ class NeighborhoodMetadata(Base):
     
 class ListingMetadata(Base):
     __tablename__ = "listing_metadata"
+    __table_args__ = (
+        # Active listings per neighborhood, counted on every recommendation request
+        Index('ix_listing_metadata_active_neighborhood_id', 'neighborhood_id', postgresql_where=text('is_active')),
+    )
     listing_id: Mapped[int] = mapped_column(Integer, ForeignKey("listings.listing_id", ondelete="CASCADE"), primary_key=True)
     neighborhood_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("neighborhoods.id", ondelete="CASCADE"))
     category_id: Mapped[Optional[int]] = mapped_column(Integer)
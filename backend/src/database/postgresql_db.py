@@ -26,6 +26,11 @@ if not DATABASE_URL:
 if DATABASE_URL.startswith("postgresql://") and not DATABASE_URL.startswith("postgresql+asyncpg://"):
     DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://")
 
+# Prepared statements cached per connection, by both SQLAlchemy's asyncpg adapter and asyncpg itself.
+# The recommendation path re-runs the same handful of statements on every request, so they are
+# parsed and planned once per connection instead of per call.
+STATEMENT_CACHE_SIZE = 512
+
 # Don't create engine at import time for migration compatibility
 engine: Optional[AsyncSession] = None
 async_session_local: Optional[Any] = None
@@ -42,14 +47,27 @@ def get_engine():
         engine = create_async_engine(
             DATABASE_URL, 
             echo=True,
-            connect_args={"ssl": ssl_context},
+            connect_args={
+                "ssl": ssl_context,
+                "prepared_statement_cache_size": STATEMENT_CACHE_SIZE,
+                "statement_cache_size": STATEMENT_CACHE_SIZE,
+            },
             pool_size=20,
-            max_overflow=0,
+            # A recommendation request holds up to three connections at once while its reads overlap
+            max_overflow=10,
             pool_pre_ping=True,
             pool_recycle=3600  # Recycle connections every hour
         )
     return engine
 
+async def close_engine():
+    """Dispose of the async engine's connection pool."""
+    global engine, async_session_local
+    if engine is not None:
+        await engine.dispose()
+        engine = None
+        async_session_local = None
+
 def get_session_local():
     """Get or create the session maker."""
     global async_session_local
@@ -10,6 +10,8 @@ from pathlib import Path
 from src.api.router import api_router
 from src.config.settings import settings
 from src.database.mongo_db import connect_to_mongo, close_mongo_connection
+from src.database.postgresql_db import close_engine
+from src.services.recommendation_service import close_routes_http_session
 
 
 # Configure logging
@@ -59,6 +61,10 @@ async def lifespan(app: FastAPI):
         logger.info("Shutting down APT. Scanner API...")
         # Disconnect from MongoDB
         await close_mongo_connection()
+        # Close pooled PostgreSQL connections
+        await close_engine()
+        # Close the pooled Routes API client
+        await close_routes_http_session()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
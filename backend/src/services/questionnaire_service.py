@@ -1,13 +1,15 @@
 """Service for managing questionnaires and user responses."""
+import asyncio
 import json
 import logging
 import numpy as np
 import random
+from collections import OrderedDict
 from typing import Dict, Any, List, Optional, Tuple
-from collections import deque
 from datetime import datetime, timezone
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 import time
 from ..utils.cache.redis_client import (
     get_cache, set_cache, delete_cache, get_questionnaire_cache_key
@@ -20,6 +22,334 @@ from . import filters_service
 
 logger = logging.getLogger(__name__)
 
+# How long a user state read stays valid in the service's in-process cache
+STATE_CACHE_TTL_SECONDS = 2.0
+
+# Stored preference vectors are read on every recommendation request and only change when a
+# questionnaire is saved, so they are kept in-process. Saves in this process update the entry;
+# the TTL bounds how long another worker can serve a vector that was replaced elsewhere.
+PREFERENCE_VECTOR_CACHE_TTL_SECONDS = 300
+PREFERENCE_VECTOR_CACHE_MAX_SIZE = 10_000
+# user_id -> (monotonic expiry, read-only preference vector), least recently used first
+_preference_vector_cache: "OrderedDict[str, Tuple[float, np.ndarray]]" = OrderedDict()
+
+
+def get_cached_preference_vector(user_id: str) -> Optional[np.ndarray]:
+    """Return the in-process preference vector for a user, or None if missing or expired."""
+    entry = _preference_vector_cache.get(user_id)
+    if entry is None:
+        return None
+    expires_at, preference_vector = entry
+    if time.monotonic() >= expires_at:
+        _preference_vector_cache.pop(user_id, None)
+        return None
+    _preference_vector_cache.move_to_end(user_id)
+    return preference_vector
+
+
+def cache_preference_vector(user_id: str, preference_vector: Any) -> np.ndarray:
+    """Store a read-only copy of a user's preference vector and return it."""
+    preference_vector = np.array(preference_vector, dtype=float)
+    preference_vector.setflags(write=False)
+    _preference_vector_cache[user_id] = (time.monotonic() + PREFERENCE_VECTOR_CACHE_TTL_SECONDS, preference_vector)
+    _preference_vector_cache.move_to_end(user_id)
+    if len(_preference_vector_cache) > PREFERENCE_VECTOR_CACHE_MAX_SIZE:
+        _preference_vector_cache.popitem(last=False)
+    return preference_vector
+
+
+def invalidate_preference_vector(user_id: str) -> None:
+    """Drop a user's in-process preference vector so the next read goes to the database."""
+    _preference_vector_cache.pop(user_id, None)
+
+# Feature names in order (matching NeighborhoodFeatures)
+FEATURE_NAMES = (
+    'cultural_level',           # 0
+    'religiosity_level',        # 1
+    'communality_level',        # 2
+    'kindergardens_level',      # 3
+    'maintenance_level',        # 4
+    'mobility_level',           # 5
+    'parks_level',              # 6
+    'peaceful_level',           # 7
+    'shopping_level',           # 8
+    'safety_level',             # 9
+    'nightlife_level'           # 10 - Added nightlife level
+)
+
+# Importance scale mapping
+_IMPORTANCE_SCALE = {
+    'Very important': 0.9,
+    'Somewhat important': 0.6,
+    'Not important': 0.1,
+    'Yes, I want to be in the center of the action': 0.9,
+    'Close but not too close': 0.6,
+    'As far as possible': 0.1,
+    'No preference': 0.5,
+    'Walking distance': 0.9,
+    'Short drive or public transport ride': 0.6,
+    'Very important - I want well-maintained buildings': 0.9,
+    'Not important - I don\'t mind older/less maintained areas': 0.1,
+    'Very important - I need a quiet area': 0.9,
+    'Not important - I don\'t mind noise': 0.1,
+    'Very important - I want an active, connected community': 0.9,
+    'Not important - I prefer privacy': 0.2,
+    'No': 0.1,
+    'Yes': 0.9,
+    'Yes, I\'m willing to compromise': 0.1,
+    'No, I want a safe neighborhood': 0.9
+}
+
+# Rules are (question_id, feature, combine) and are applied in order.
+# combine=None overwrites the feature with the answer's importance,
+# otherwise the current value and the importance are merged with it.
+_BASIC_IMPORTANCE_RULES = (
+    ('religious_community_importance', 'religiosity_level', None),
+    ('safety_priority', 'safety_level', None),
+)
+
+_AMENITY_IMPORTANCE_RULES = (
+    ('learning_space_nearby', 'cultural_level', max),
+    ('proximity_to_shopping_centers', 'shopping_level', None),
+    ('proximity_to_green_spaces', 'parks_level', None),
+    ('family_activities_nearby', 'communality_level', max),
+)
+
+_CHARACTER_IMPORTANCE_RULES = (
+    ('community_involvement_preference', 'communality_level', max),
+    ('cultural_activities_importance', 'cultural_level', max),
+    ('neighborhood_quality_importance', 'maintenance_level', None),
+    ('building_condition_preference', 'maintenance_level', max),
+    ('quiet_hours_importance', 'peaceful_level', max),
+)
+
+_COMMUTE_MOBILITY_LEVELS = {
+    'Public transport': 0.8,
+    'Walking': 0.8,
+    'Bicycle / scooter': 0.7,
+    'Private car': 0.4,
+}
+
+# Adjustments are (feature, combine, value) with the same combine semantics
+_CHILDREN_ADJUSTMENTS = (
+    ('safety_level', max, 0.8),
+    ('kindergardens_level', max, 0.7),
+    ('peaceful_level', max, 0.7),
+)
+
+_NIGHTLIFE_ADJUSTMENTS = {
+    'Yes, I want to be in the center of the action': (
+        ('nightlife_level', max, 0.9),
+        ('cultural_level', max, 0.9),
+        ('peaceful_level', min, 0.3),
+    ),
+    'Close but not too close': (
+        ('nightlife_level', max, 0.6),
+        ('cultural_level', max, 0.6),
+        ('peaceful_level', None, 0.6),
+    ),
+    'As far as possible': (
+        ('nightlife_level', min, 0.2),
+        ('cultural_level', min, 0.2),
+        ('peaceful_level', max, 0.9),
+    ),
+}
+
+# Persona adjustments keyed by housing purpose, in matching priority order
+_PERSONA_ADJUSTMENTS = {
+    'Just me': (
+        ('cultural_level', max, 0.6),
+        ('shopping_level', max, 0.6),
+        ('mobility_level', max, 0.6),
+        ('nightlife_level', max, 0.6),
+    ),
+    'With a partner': (
+        ('cultural_level', max, 0.6),
+        ('peaceful_level', max, 0.6),
+        ('shopping_level', max, 0.6),
+    ),
+    'With family (and children)': (
+        ('safety_level', max, 0.8),
+        ('kindergardens_level', max, 0.7),
+        ('parks_level', max, 0.7),
+        ('peaceful_level', max, 0.7),
+        ('communality_level', max, 0.6),
+        ('nightlife_level', min, 0.3),  # Families typically avoid nightlife areas
+    ),
+    'With roommates': (
+        ('cultural_level', max, 0.7),
+        ('shopping_level', max, 0.6),
+        ('mobility_level', max, 0.7),
+        ('nightlife_level', max, 0.7),
+    ),
+}
+
+
+# Marks an unanswered question, since an answer may itself be None
+_MISSING = object()
+
+
+def _apply_importance_rules(rules: Tuple, responses: Dict, preferences: Dict, importance_scale: Dict) -> None:
+    """Apply (question_id, feature, combine) importance rules to preferences in place."""
+    scale_get = importance_scale.get
+    response_get = responses.get
+    for question_id, feature, combine in rules:
+        answer = response_get(question_id, _MISSING)
+        if answer is not _MISSING:
+            importance = scale_get(answer, 0.5)
+            preferences[feature] = importance if combine is None else combine(preferences[feature], importance)
+
+
+def _apply_adjustments(adjustments: Tuple, preferences: Dict) -> None:
+    """Apply (feature, combine, value) adjustments to preferences in place."""
+    for feature, combine, value in adjustments:
+        preferences[feature] = value if combine is None else combine(preferences[feature], value)
+
+
+FEATURE_INDEX = {feature: index for index, feature in enumerate(FEATURE_NAMES)}
+
+_NP_COMBINE = {max: np.maximum, min: np.minimum}
+
+
+def _merge_column(preferences: np.ndarray, rows: List[int], feature: str, combine, values) -> None:
+    """Vectorized counterpart of a single rule for the rows of a preference matrix."""
+    if not rows:
+        return
+    column = FEATURE_INDEX[feature]
+    if combine is None:
+        preferences[rows, column] = values
+    else:
+        preferences[rows, column] = _NP_COMBINE[combine](preferences[rows, column], values)
+
+
+def _merge_adjustment_groups(preferences: np.ndarray, groups: Dict[Tuple, List[int]]) -> None:
+    """Apply each adjustments tuple to the rows of the users that selected it."""
+    for adjustments, rows in groups.items():
+        for feature, combine, value in adjustments:
+            _merge_column(preferences, rows, feature, combine, value)
+
+
+def _match_persona_adjustments(housing_purpose: str) -> Tuple:
+    """Return the persona adjustments for a housing purpose answer."""
+    adjustments = _PERSONA_ADJUSTMENTS.get(housing_purpose)
+    if adjustments is not None:
+        return adjustments
+    # Fall back to substring matching for answers with extra text
+    for persona, persona_adjustments in _PERSONA_ADJUSTMENTS.items():
+        if persona in housing_purpose:
+            return persona_adjustments
+    return ()
+
+
+def _map_basic_questions(responses: Dict, preferences: Dict) -> None:
+    """Map basic information questions."""
+    _apply_importance_rules(_BASIC_IMPORTANCE_RULES, responses, preferences, _IMPORTANCE_SCALE)
+
+    mobility = _COMMUTE_MOBILITY_LEVELS.get(responses.get('commute_pref'))
+    if mobility is not None:
+        preferences['mobility_level'] = mobility
+
+
+def _map_dynamic_questions(responses: Dict, preferences: Dict) -> None:
+    """Map dynamic questionnaire questions."""
+    response_get = responses.get
+
+    # Children ages -> affects multiple features
+    children_ages = response_get('children_ages', _MISSING)
+    if children_ages is not _MISSING:
+        if isinstance(children_ages, list):
+            children_ages = children_ages[0] if children_ages else 'No children'
+
+        if 'No children' not in children_ages:
+            _apply_adjustments(_CHILDREN_ADJUSTMENTS, preferences)
+
+    # Learning spaces, shopping, green spaces, family activities
+    _apply_importance_rules(_AMENITY_IMPORTANCE_RULES, responses, preferences, _IMPORTANCE_SCALE)
+
+    # Nightlife -> nightlife_level and peaceful_level (inverse)
+    nightlife_proximity = response_get('nightlife_proximity', _MISSING)
+    if nightlife_proximity is not _MISSING:
+        _apply_adjustments(_NIGHTLIFE_ADJUSTMENTS.get(nightlife_proximity, ()), preferences)
+
+    # Community, culture, maintenance and quiet hours
+    _apply_importance_rules(_CHARACTER_IMPORTANCE_RULES, responses, preferences, _IMPORTANCE_SCALE)
+
+    # Pet ownership -> parks_level
+    if response_get('pet_ownership') == 'Yes':
+        preferences['parks_level'] = max(preferences['parks_level'], 0.7)
+
+
+def _apply_persona_logic(responses: Dict, preferences: Dict) -> None:
+    """Apply logic based on housing purpose (user persona)."""
+    # housing_purpose is a single string once answers are normalized
+    housing_purpose = responses.get('housing_purpose', _MISSING)
+    if housing_purpose is not _MISSING:
+        _apply_adjustments(_match_persona_adjustments(housing_purpose), preferences)
+
+
+def calculate_preference_vector(responses: Dict[str, Any]) -> np.ndarray:
+    """
+    Calculate a user preference vector from questionnaire responses.
+    Shared with the recommendation service so both derive the same vector.
+    """
+    preferences = dict.fromkeys(FEATURE_NAMES, 0.5)  # Default neutral
+
+    # Apply mapping logic
+    _map_basic_questions(responses, preferences)
+    _map_dynamic_questions(responses, preferences)
+    _apply_persona_logic(responses, preferences)
+
+    # Convert to array
+    return np.array([preferences[feature] for feature in FEATURE_NAMES])
+
+
+# Every answer calculate_preference_vector reads, for callers that fingerprint responses
+PREFERENCE_QUESTION_IDS = tuple(
+    [question_id for question_id, _, _ in _BASIC_IMPORTANCE_RULES]
+    + ['commute_pref', 'children_ages']
+    + [question_id for question_id, _, _ in _AMENITY_IMPORTANCE_RULES]
+    + ['nightlife_proximity']
+    + [question_id for question_id, _, _ in _CHARACTER_IMPORTANCE_RULES]
+    + ['pet_ownership', 'housing_purpose']
+)
+
+
+# Questions answered with a single option, even when the client sends a one-item list
+_SINGLE_CHOICE_QUESTIONS = ('housing_purpose', 'accessibility_needs', 'pet_ownership')
+
+
+def _normalize_budget_range(budget: Any) -> Optional[List[int]]:
+    """Coerce a budget answer to [price_min, price_max], or None if it cannot be parsed."""
+    try:
+        if isinstance(budget, (list, tuple)) and len(budget) >= 2:
+            return [int(budget[0]), int(budget[1])]
+        if isinstance(budget, (int, float, str)):
+            # A single value represents the max budget
+            price_max = int(budget)
+            return [int(price_max * 0.5), price_max]
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+def normalize_answers(answers: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Coerce single-valued answers to their canonical shape, in place.
+    Single-choice answers become a string and budget_range becomes [min, max].
+    """
+    for question_id in _SINGLE_CHOICE_QUESTIONS:
+        answer = answers.get(question_id)
+        if isinstance(answer, list):
+            answers[question_id] = answer[0] if answer else ''
+
+    if answers.get('budget_range') is not None:
+        budget = _normalize_budget_range(answers['budget_range'])
+        if budget is not None:
+            answers['budget_range'] = budget
+        else:
+            logger.debug(f"Could not parse budget_range value: {answers['budget_range']}")
+    return answers
+
 class QuestionnaireService:
     """Service for managing questionnaires and user responses."""
     
@@ -34,11 +364,15 @@ class QuestionnaireService:
         self.mongo_db = get_mongo_db()
         self.basic_information_questions = {}
         self.dynamic_questionnaire = {}
+        self._all_question_ids = frozenset()
         self.question_graph = {}
         self.current_version = 1
         self.total_questions = 0
         self.initial_participating_questions_count = 0
         self.added_participating_questions_count = 0
+        # user_id -> (monotonic timestamp, state); the service is created per request,
+        # so this collapses the repeated state reads made while handling one call
+        self._state_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
         
     async def load_questions(self):
         """
@@ -50,6 +384,7 @@ class QuestionnaireService:
             return
 
         await self._load_questions_from_db()
+        self._refresh_all_question_ids()
         self.question_graph = self._build_question_graph()
         logger.info(f"Built question graph with {len(self.question_graph)} entries")
 
@@ -134,7 +469,7 @@ class QuestionnaireService:
         try:
             state_record = await self.mongo_db.questionnaire_states.find_one({"user_id": user_id})
             if not state_record: return None
-            state_record['queue'] = deque(state_record.get('queue', []))
+            state_record.setdefault('queue', [])
             return state_record
         except Exception as e:
             logger.error(f"Error retrieving user state from MongoDB: {e}")
@@ -144,8 +479,9 @@ class QuestionnaireService:
         if self.mongo_db is None: return False
         try:
             mongo_state = state.copy()
-            mongo_state['queue'] = list(mongo_state.get('queue', []))
-            mongo_state['last_updated'] = datetime.now(timezone.utc)
+            mongo_state.setdefault('queue', [])
+            now = datetime.now(timezone.utc)
+            mongo_state['last_updated'] = now
 
             if 'user_id' in mongo_state: del mongo_state['user_id']
             if 'created_at' in mongo_state: del mongo_state['created_at']
@@ -154,7 +490,7 @@ class QuestionnaireService:
 
             await self.mongo_db.questionnaire_states.update_one(
                 {"user_id": user_id},
-                {"$set": mongo_state, "$setOnInsert": {"user_id": user_id, "created_at": datetime.now(timezone.utc)}},
+                {"$set": mongo_state, "$setOnInsert": {"user_id": user_id, "created_at": now}},
                 upsert=True
             )
             return True
@@ -171,23 +507,57 @@ class QuestionnaireService:
             logger.error(f"Error deleting user state from MongoDB: {e}")
             return False
 
+    def _remember_state(self, user_id: str, state: Dict[str, Any]) -> None:
+        self._state_cache[user_id] = (time.monotonic(), state)
+
+    def _forget_state(self, user_id: str) -> None:
+        self._state_cache.pop(user_id, None)
+
+    def _prepare_loaded_state(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Bring a state read from Redis or MongoDB up to the current shape, in place."""
+        state.setdefault('queue', [])
+        # Migrate existing states to include current_question_id
+        if 'current_question_id' not in state:
+            state['current_question_id'] = None
+        normalize_answers(state.setdefault('answers', {}))
+        return state
+
+    async def _get_stored_user_state(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Read a user's existing state without creating or caching one.
+        Safe to run concurrently with other reads; returns None if the user has no stored state.
+        """
+        local_entry = self._state_cache.get(user_id)
+        if local_entry and time.monotonic() - local_entry[0] < STATE_CACHE_TTL_SECONDS:
+            return local_entry[1]
+
+        cached_state = get_cache(get_questionnaire_cache_key(user_id))
+        if cached_state:
+            return self._prepare_loaded_state(cached_state)
+
+        db_state = await self._get_user_state_from_db(user_id)
+        if db_state:
+            return self._prepare_loaded_state(db_state)
+        return None
+
     async def get_user_state(self, user_id: str) -> Dict[str, Any]:
+        local_entry = self._state_cache.get(user_id)
+        if local_entry and time.monotonic() - local_entry[0] < STATE_CACHE_TTL_SECONDS:
+            return local_entry[1]
+
         cache_key = get_questionnaire_cache_key(user_id)
         cached_state = get_cache(cache_key)
         if cached_state:
-            cached_state['queue'] = deque(cached_state.get('queue', []))
-            # Migrate existing states to include current_question_id
-            if 'current_question_id' not in cached_state:
-                cached_state['current_question_id'] = None
+            self._prepare_loaded_state(cached_state)
             logger.debug(f"Using cached state for user {user_id}")
+            self._remember_state(user_id, cached_state)
             return cached_state
             
         db_state = await self._get_user_state_from_db(user_id)
         if db_state:
-            # Migrate existing states to include current_question_id
-            if 'current_question_id' not in db_state:
-                db_state['current_question_id'] = None
+            self._prepare_loaded_state(db_state)
             set_cache(cache_key, db_state)
+            self._remember_state(user_id, db_state)
             return db_state
         
         # Check if user has a completed questionnaire but no active state
@@ -196,8 +566,8 @@ class QuestionnaireService:
             logger.info(f"User {user_id} has completed questionnaire, creating state with answered questions")
             initial_state = self._create_initial_state()
             # Populate answered questions from completed questionnaire
-            initial_state['answers'] = completed_questionnaire.get('answers', {})
-            initial_state['answered_questions'] = list(completed_questionnaire.get('answers', {}).keys())
+            initial_state['answers'] = normalize_answers(completed_questionnaire.get('answers', {}))
+            initial_state['answered_questions'] = list(initial_state['answers'].keys())
             initial_state['version'] = completed_questionnaire.get('questionnaire_version', self.current_version)
             # Don't save to DB or cache yet - let the caller handle that
             # This prevents race conditions with the continuing_additional flag
@@ -206,6 +576,7 @@ class QuestionnaireService:
         initial_state = self._create_initial_state()
         await self._update_user_state_in_db(user_id, initial_state)
         set_cache(cache_key, initial_state)
+        self._remember_state(user_id, initial_state)
         return initial_state
         
     def _create_initial_state(self) -> Dict[str, Any]:
@@ -214,16 +585,16 @@ class QuestionnaireService:
             self._create_default_questions()
         
         basic_q_ids = [q['id'] for q in self.basic_information_questions.values()]
-        queue = deque(basic_q_ids)
-        logger.info(f"Created initial queue with {len(queue)} questions: {basic_q_ids}")
+        logger.info(f"Created initial queue with {len(basic_q_ids)} questions: {basic_q_ids}")
         return {
-            'queue': queue, 'answers': {}, 'answered_questions': [],
+            'queue': basic_q_ids, 'answers': {}, 'answered_questions': [],
             'current_question_id': None,  # Track current question without removing from queue
             'participating_questions_count': self.total_questions,
             'version': self.current_version, 'start_time': time.time()
         }
         
     async def update_user_state(self, user_id: str, state: Dict[str, Any]) -> bool:
+        self._remember_state(user_id, state)
         cache_key = get_questionnaire_cache_key(user_id)
         cache_updated = set_cache(cache_key, state)
         db_updated = await self._update_user_state_in_db(user_id, state)
@@ -250,8 +621,11 @@ class QuestionnaireService:
                 
                 # Remove the answered question from queue if it's the current one
                 if state.get('current_question_id') == q_id and state['queue'] and state['queue'][0] == q_id:
-                    state['queue'].popleft()
+                    state['queue'].pop(0)
                     state['current_question_id'] = None
+            
+            # Store single-valued answers in their canonical shape
+            normalize_answers(state['answers'])
         
         self._add_follow_up_questions_to_queue(state)
 
@@ -327,7 +701,7 @@ class QuestionnaireService:
             follow_up_id = graph_node['on_unanswered'].get('id')
 
         if follow_up_id and follow_up_id not in state['queue']:
-            state['queue'].appendleft(follow_up_id)
+            state['queue'].insert(0, follow_up_id)
             logger.info(f"Added follow-up question '{follow_up_id}' to the front of the queue.")
     
     async def _get_next_question_from_queue(self, state: Dict[str, Any], user_id: str) -> Optional[Dict[str, Any]]:
@@ -459,6 +833,7 @@ class QuestionnaireService:
             
             await self._delete_user_state_from_db(user_id)
             delete_cache(get_questionnaire_cache_key(user_id))
+            self._forget_state(user_id)
             return True
         except Exception as e:
             logger.error(f"Error saving completed questionnaire to MongoDB: {e}")
@@ -514,198 +889,147 @@ class QuestionnaireService:
                 self.db_session.add(user_pref_vector)
             
             await self.db_session.commit()
+            cache_preference_vector(user_id, preference_vector)
             logger.info(f"Successfully saved preference vector for user {user_id}")
             return True
             
         except Exception as e:
             logger.error(f"Error saving preference vector for user {user_id}: {e}", exc_info=True)
+            invalidate_preference_vector(user_id)
             await self.db_session.rollback()
             return False
 
     def _calculate_preference_vector(self, responses: Dict[str, Any]) -> np.ndarray:
+        """Calculate user preference vector from questionnaire responses."""
+        return calculate_preference_vector(responses)
+
+    def _calculate_preference_matrix(self, responses_list: List[Dict[str, Any]]) -> np.ndarray:
         """
-        Calculate user preference vector from questionnaire responses.
-        Uses the same logic as the recommendation service.
+        Calculate preference vectors for many users at once.
+        Applies the same rules as _calculate_preference_vector, but merges each
+        rule into a whole column of the (users x features) matrix.
         """
-        # Feature names in order (matching NeighborhoodFeatures)
-        feature_names = [
-            'cultural_level',           # 0
-            'religiosity_level',        # 1  
-            'communality_level',        # 2
-            'kindergardens_level',      # 3
-            'maintenance_level',        # 4
-            'mobility_level',           # 5
-            'parks_level',              # 6
-            'peaceful_level',           # 7
-            'shopping_level',           # 8
-            'safety_level',             # 9
-            'nightlife_level'           # 10 - Added nightlife level
-        ]
-        
-        # Importance scale mapping
-        importance_scale = {
-            'Very important': 0.9,
-            'Somewhat important': 0.6,
-            'Not important': 0.1,
-            'Yes, I want to be in the center of the action': 0.9,
-            'Close but not too close': 0.6,
-            'As far as possible': 0.1,
-            'No preference': 0.5,
-            'Walking distance': 0.9,
-            'Short drive or public transport ride': 0.6,
-            'Very important - I want well-maintained buildings': 0.9,
-            'Not important - I don\'t mind older/less maintained areas': 0.1,
-            'Very important - I need a quiet area': 0.9,
-            'Not important - I don\'t mind noise': 0.1,
-            'Very important - I want an active, connected community': 0.9,
-            'Not important - I prefer privacy': 0.2,
-            'No': 0.1,
-            'Yes': 0.9
-        }
-        
-        preferences = {feature: 0.5 for feature in feature_names}  # Default neutral
-        
-        # Apply mapping logic
-        self._map_basic_questions(responses, preferences, importance_scale)
-        self._map_dynamic_questions(responses, preferences, importance_scale)
-        self._apply_persona_logic(responses, preferences)
-        
-        # Convert to array
-        preference_vector = np.array([preferences[feature] for feature in feature_names])
-        return preference_vector
-
-    def _map_basic_questions(self, responses: Dict, preferences: Dict, importance_scale: Dict):
-        """Map basic information questions."""
-        if 'religious_community_importance' in responses:
-            importance = importance_scale.get(responses['religious_community_importance'], 0.5)
-            preferences['religiosity_level'] = importance
-        
-        if 'safety_priority' in responses:
-            importance = importance_scale.get(responses['safety_priority'], 0.5)
-            preferences['safety_level'] = importance
-        
-        if 'commute_pref' in responses:
-            commute_type = responses['commute_pref']
-            if commute_type in ['Public transport', 'Walking']:
-                preferences['mobility_level'] = 0.8
-            elif commute_type in ['Bicycle / scooter']:
-                preferences['mobility_level'] = 0.7
-            elif commute_type == 'Private car':
-                preferences['mobility_level'] = 0.4
-
-    def _map_dynamic_questions(self, responses: Dict, preferences: Dict, importance_scale: Dict):
-        """Map dynamic questionnaire questions."""
-        # Children ages -> affects multiple features
-        if 'children_ages' in responses:
-            children_ages = responses['children_ages']
-            if isinstance(children_ages, list):
-                children_ages = children_ages[0] if children_ages else 'No children'
-            
-            if 'No children' not in children_ages:
-                preferences['safety_level'] = max(preferences['safety_level'], 0.8)
-                preferences['kindergardens_level'] = max(preferences['kindergardens_level'], 0.7)
-                preferences['peaceful_level'] = max(preferences['peaceful_level'], 0.7)
-        
-        # Learning spaces -> cultural_level
-        if 'learning_space_nearby' in responses:
-            importance = importance_scale.get(responses['learning_space_nearby'], 0.5)
-            preferences['cultural_level'] = max(preferences['cultural_level'], importance)
-        
-        # Shopping centers -> shopping_level
-        if 'proximity_to_shopping_centers' in responses:
-            importance = importance_scale.get(responses['proximity_to_shopping_centers'], 0.5)
-            preferences['shopping_level'] = importance
-        
-        # Green spaces -> parks_level
-        if 'proximity_to_green_spaces' in responses:
-            importance = importance_scale.get(responses['proximity_to_green_spaces'], 0.5)
-            preferences['parks_level'] = importance
-        
-        # Family activities -> communality_level
-        if 'family_activities_nearby' in responses:
-            importance = importance_scale.get(responses['family_activities_nearby'], 0.5)
-            preferences['communality_level'] = max(preferences['communality_level'], importance)
-        
-        # Nightlife -> nightlife_level and peaceful_level (inverse)
-        if 'nightlife_proximity' in responses:
-            response = responses['nightlife_proximity']
-            if response == 'Yes, I want to be in the center of the action':
-                preferences['nightlife_level'] = max(preferences['nightlife_level'], 0.9)
-                preferences['cultural_level'] = max(preferences['cultural_level'], 0.9)
-                preferences['peaceful_level'] = min(preferences['peaceful_level'], 0.3)
-            elif response == 'Close but not too close':
-                preferences['nightlife_level'] = max(preferences['nightlife_level'], 0.6)
-                preferences['cultural_level'] = max(preferences['cultural_level'], 0.6)
-                preferences['peaceful_level'] = 0.6
-            elif response == 'As far as possible':
-                preferences['nightlife_level'] = min(preferences['nightlife_level'], 0.2)
-                preferences['cultural_level'] = min(preferences['cultural_level'], 0.2)
-                preferences['peaceful_level'] = max(preferences['peaceful_level'], 0.9)
-        
-        # Community involvement -> communality_level
-        if 'community_involvement_preference' in responses:
-            importance = importance_scale.get(responses['community_involvement_preference'], 0.5)
-            preferences['communality_level'] = max(preferences['communality_level'], importance)
-        
-        # Cultural activities -> cultural_level
-        if 'cultural_activities_importance' in responses:
-            importance = importance_scale.get(responses['cultural_activities_importance'], 0.5)
-            preferences['cultural_level'] = max(preferences['cultural_level'], importance)
-        
-        # Neighborhood quality -> maintenance_level
-        if 'neighborhood_quality_importance' in responses:
-            importance = importance_scale.get(responses['neighborhood_quality_importance'], 0.5)
-            preferences['maintenance_level'] = importance
-        
-        # Building condition -> maintenance_level
-        if 'building_condition_preference' in responses:
-            importance = importance_scale.get(responses['building_condition_preference'], 0.5)
-            preferences['maintenance_level'] = max(preferences['maintenance_level'], importance)
-        
-        # Quiet hours -> peaceful_level
-        if 'quiet_hours_importance' in responses:
-            importance = importance_scale.get(responses['quiet_hours_importance'], 0.5)
-            preferences['peaceful_level'] = max(preferences['peaceful_level'], importance)
-        
-        # Pet ownership -> parks_level
-        if 'pet_ownership' in responses:
-            if responses['pet_ownership'] == 'Yes':
-                preferences['parks_level'] = max(preferences['parks_level'], 0.7)
-
-    def _apply_persona_logic(self, responses: Dict, preferences: Dict):
-        """Apply logic based on housing purpose (user persona)."""
-        if 'housing_purpose' not in responses:
-            return
-        
-        housing_purpose = responses['housing_purpose']
-        if isinstance(housing_purpose, list):
-            housing_purpose = housing_purpose[0] if housing_purpose else ''
-        
-        # Adjust preferences based on persona
-        if 'Just me' in housing_purpose:
-            preferences['cultural_level'] = max(preferences['cultural_level'], 0.6)
-            preferences['shopping_level'] = max(preferences['shopping_level'], 0.6)
-            preferences['mobility_level'] = max(preferences['mobility_level'], 0.6)
-            preferences['nightlife_level'] = max(preferences['nightlife_level'], 0.6)
-            
-        elif 'With a partner' in housing_purpose:
-            preferences['cultural_level'] = max(preferences['cultural_level'], 0.6)
-            preferences['peaceful_level'] = max(preferences['peaceful_level'], 0.6)
-            preferences['shopping_level'] = max(preferences['shopping_level'], 0.6)
-            
-        elif 'With family (and children)' in housing_purpose:
-            preferences['safety_level'] = max(preferences['safety_level'], 0.8)
-            preferences['kindergardens_level'] = max(preferences['kindergardens_level'], 0.7)
-            preferences['parks_level'] = max(preferences['parks_level'], 0.7)
-            preferences['peaceful_level'] = max(preferences['peaceful_level'], 0.7)
-            preferences['communality_level'] = max(preferences['communality_level'], 0.6)
-            preferences['nightlife_level'] = min(preferences['nightlife_level'], 0.3)  # Families typically avoid nightlife areas
-            
-        elif 'With roommates' in housing_purpose:
-            preferences['cultural_level'] = max(preferences['cultural_level'], 0.7)
-            preferences['shopping_level'] = max(preferences['shopping_level'], 0.6)
-            preferences['mobility_level'] = max(preferences['mobility_level'], 0.7)
-            preferences['nightlife_level'] = max(preferences['nightlife_level'], 0.7)
+        # Same dtype as calculate_preference_vector, so both writers store identical values
+        preferences = np.full((len(responses_list), len(FEATURE_NAMES)), 0.5, dtype=float)
+        if not responses_list:
+            return preferences
+
+        self._merge_importance_rules(preferences, responses_list, _BASIC_IMPORTANCE_RULES)
+
+        commute_rows, commute_levels = [], []
+        for row, responses in enumerate(responses_list):
+            if 'commute_pref' in responses:
+                mobility = _COMMUTE_MOBILITY_LEVELS.get(responses['commute_pref'])
+                if mobility is not None:
+                    commute_rows.append(row)
+                    commute_levels.append(mobility)
+        _merge_column(preferences, commute_rows, 'mobility_level', None, commute_levels)
+
+        children_rows = []
+        for row, responses in enumerate(responses_list):
+            if 'children_ages' in responses:
+                children_ages = responses['children_ages']
+                if isinstance(children_ages, list):
+                    children_ages = children_ages[0] if children_ages else 'No children'
+                if 'No children' not in children_ages:
+                    children_rows.append(row)
+        _merge_adjustment_groups(preferences, {_CHILDREN_ADJUSTMENTS: children_rows})
+
+        self._merge_importance_rules(preferences, responses_list, _AMENITY_IMPORTANCE_RULES)
+
+        nightlife_groups = {}
+        for row, responses in enumerate(responses_list):
+            if 'nightlife_proximity' in responses:
+                adjustments = _NIGHTLIFE_ADJUSTMENTS.get(responses['nightlife_proximity'])
+                if adjustments:
+                    nightlife_groups.setdefault(adjustments, []).append(row)
+        _merge_adjustment_groups(preferences, nightlife_groups)
+
+        self._merge_importance_rules(preferences, responses_list, _CHARACTER_IMPORTANCE_RULES)
+
+        pet_rows = [row for row, responses in enumerate(responses_list) if responses.get('pet_ownership') == 'Yes']
+        _merge_column(preferences, pet_rows, 'parks_level', max, 0.7)
+
+        persona_groups = {}
+        for row, responses in enumerate(responses_list):
+            if 'housing_purpose' in responses:
+                adjustments = _match_persona_adjustments(responses['housing_purpose'])
+                if adjustments:
+                    persona_groups.setdefault(adjustments, []).append(row)
+        _merge_adjustment_groups(preferences, persona_groups)
+
+        return preferences
+
+    def _merge_importance_rules(self, preferences: np.ndarray, responses_list: List[Dict[str, Any]], rules: Tuple) -> None:
+        """Merge importance rules into the preference matrix, one column per rule."""
+        scale_get = _IMPORTANCE_SCALE.get
+        for question_id, feature, combine in rules:
+            rows, importances = [], []
+            for row, responses in enumerate(responses_list):
+                if question_id in responses:
+                    rows.append(row)
+                    importances.append(scale_get(responses[question_id], 0.5))
+            _merge_column(preferences, rows, feature, combine, importances)
+
+    async def recalculate_preference_vectors(self, user_ids: Optional[List[str]] = None) -> int:
+        """
+        Recalculate and save preference vectors for users with a completed questionnaire.
+
+        Args:
+            user_ids: Users to recalculate, or None for every completed questionnaire
+
+        Returns:
+            Number of preference vectors saved
+        """
+        if self.mongo_db is None or self.db_session is None:
+            return 0
+
+        query = {"user_id": {"$in": user_ids}} if user_ids is not None else {}
+        try:
+            cursor = self.mongo_db.completed_questionnaires.find(
+                query, {'_id': 0, 'user_id': 1, 'answers': 1, 'questionnaire_version': 1}
+            )
+            completed = [doc for doc in await cursor.to_list(length=None) if doc.get('answers')]
+            if not completed:
+                return 0
+
+            preference_matrix = self._calculate_preference_matrix(
+                [normalize_answers(doc['answers']) for doc in completed]
+            )
+
+            now = datetime.now(timezone.utc)
+
+            # One row per user (the last completed questionnaire wins), written as a single
+            # batched INSERT ... ON CONFLICT DO UPDATE instead of loading and updating each record
+            rows = {}
+            for doc, preference_vector in zip(completed, preference_matrix.tolist()):
+                rows[doc['user_id']] = {
+                    'user_id': doc['user_id'],
+                    **dict(zip(FEATURE_NAMES, preference_vector)),
+                    'preference_vector': preference_vector,
+                    'questionnaire_version': doc.get('questionnaire_version', self.current_version),
+                    'updated_at': now
+                }
+
+            upsert = pg_insert(UserPreferenceVector)
+            upsert = upsert.on_conflict_do_update(
+                index_elements=[UserPreferenceVector.user_id],
+                set_={
+                    column: upsert.excluded[column]
+                    for column in (*FEATURE_NAMES, 'preference_vector', 'questionnaire_version', 'updated_at')
+                }
+            )
+            await self.db_session.execute(upsert, list(rows.values()))
+            await self.db_session.commit()
+            for user_id in rows:
+                invalidate_preference_vector(user_id)
+            logger.info(f"Recalculated preference vectors for {len(rows)} users")
+            return len(rows)
+
+        except Exception as e:
+            logger.error(f"Error recalculating preference vectors: {e}", exc_info=True)
+            await self.db_session.rollback()
+            return 0
 
     async def get_completed_questionnaire(self, user_id: str) -> Optional[Dict[str, Any]]:
         if self.mongo_db is None:
@@ -772,9 +1096,7 @@ class QuestionnaireService:
             # The answer will remain in user_state['answers'][last_question_id]
             
             # Update queue to include the removed question at the front
-            if 'queue' not in user_state:
-                user_state['queue'] = deque()
-            user_state['queue'].appendleft(last_question_id)
+            user_state.setdefault('queue', []).insert(0, last_question_id)
             
             # Save updated state
             success = await self.update_user_state(user_id, user_state)
@@ -812,14 +1134,21 @@ class QuestionnaireService:
             Dictionary of user's answers or None if no responses found
         """
         try:
-            # Try to get completed questionnaire first
-            completed = await self.get_completed_questionnaire(user_id)
+            # Read the completed questionnaire and any stored state concurrently, preferring the
+            # completed questionnaire; the stored-state read has no side effects
+            completed, user_state = await asyncio.gather(
+                self.get_completed_questionnaire(user_id),
+                self._get_stored_user_state(user_id)
+            )
             if completed and 'answers' in completed:
                 logger.info(f"Found completed questionnaire for user {user_id}")
-                return completed['answers']
+                return normalize_answers(completed['answers'])
+            
+            if user_state is None:
+                # No state yet: let get_user_state create the initial one
+                user_state = await self.get_user_state(user_id)
             
             # Fallback to current user state if no completed questionnaire
-            user_state = await self.get_user_state(user_id)
             if user_state and 'answers' in user_state and user_state['answers']:
                 logger.info(f"Using current answers from user state for user {user_id}")
                 return user_state['answers']
@@ -841,7 +1170,7 @@ class QuestionnaireService:
         
         if current_q_id and state['queue'] and state['queue'][0] == current_q_id:
             # Remove the question from queue and clear current question
-            state['queue'].popleft()
+            state['queue'].pop(0)
             state['current_question_id'] = None
             await self.update_user_state(user_id, state)
             logger.info(f"Skipped question '{current_q_id}' for user {user_id}")
@@ -855,6 +1184,11 @@ class QuestionnaireService:
             "default_question": {"id": "default_question", "text": "Default question", "type": "text"}
         }
         self.dynamic_questionnaire = {}
+        self._refresh_all_question_ids()
+
+    def _refresh_all_question_ids(self) -> None:
+        """Cache the ids of all top-level questions for completion checks."""
+        self._all_question_ids = frozenset(self.basic_information_questions).union(self.dynamic_questionnaire)
 
     
     COMPLETION_PROMPT = {
@@ -866,7 +1200,7 @@ class QuestionnaireService:
         "display_type": "continuation_page"
     }
 
-    async def calculate_questionnaire_progress(
+    def calculate_questionnaire_progress(
         self, 
         user_state: Optional[Dict[str, Any]]
     ) -> Optional[float]:
@@ -874,14 +1208,10 @@ class QuestionnaireService:
         if not user_state:
             return 0.0
 
-        answered_questions = user_state.get('answered_questions', [])
-        num_answered = len(answered_questions)
+        num_answered = len(user_state.get('answered_questions', ()))
         
-        if num_answered <= 10:
-            target_batch_size = 10
-        else:
-            additional_batches = (num_answered - 10 + 4) // 5  
-            target_batch_size = 10 + (additional_batches * 5)
+        # First batch is 10 questions, then round up to the end of the current batch of 5
+        target_batch_size = 10 + (max(num_answered - 10, 0) + 4) // 5 * 5
         
         total_questions = len(self.basic_information_questions) + len(self.dynamic_questionnaire)
         target_batch_size = min(target_batch_size, total_questions)
@@ -903,13 +1233,8 @@ class QuestionnaireService:
         if not user_state:
             return False
             
-        answered_questions = user_state.get('answered_questions', [])
-        num_answered = len(answered_questions)
-
-        if num_answered == 10 or (num_answered > 10 and (num_answered - 10) % 5 == 0):
-            return True
-        
-        return False
+        num_answered = len(user_state.get('answered_questions', ()))
+        return num_answered >= 10 and (num_answered - 10) % 5 == 0
 
     def should_show_final_prompt(
         self, 
@@ -919,16 +1244,13 @@ class QuestionnaireService:
         if not user_state:
             return False
         
-        answered_questions = user_state.get('answered_questions', [])
-        queue = user_state.get('queue', [])
-        
-        all_question_ids = list(self.basic_information_questions.keys()) + list(self.dynamic_questionnaire.keys())
-        
-        all_answered = all(q_id in answered_questions for q_id in all_question_ids)
+        # Mid-questionnaire the queue is non-empty, so check it before the answers
+        if user_state.get('queue'):
+            return False
         
-        return not queue and all_answered
+        return self._all_question_ids.issubset(user_state.get('answered_questions', ()))
 
-    async def get_current_stage_counts(
+    def get_current_stage_counts(
         self, 
         user_state: Optional[Dict[str, Any]]
     ) -> Tuple[Optional[int], Optional[int]]:
@@ -949,6 +1271,53 @@ class QuestionnaireService:
             current_batch_size = batch_end - batch_start
             return current_batch_size, questions_in_current_batch
 
+    def _build_response(
+        self,
+        user_state: Optional[Dict[str, Any]],
+        question: Optional[Dict[str, Any]] = None,
+        is_complete: bool = False,
+        show_continuation: bool = False
+    ) -> Dict[str, Any]:
+        """Build the questionnaire API response, computing progress and stage counts once."""
+        current_stage_total, current_stage_answered = self.get_current_stage_counts(user_state)
+        return {
+            "question": question,
+            "is_complete": is_complete,
+            "progress": 100.0 if is_complete else self.calculate_questionnaire_progress(user_state),
+            "current_stage_total_questions": current_stage_total,
+            "current_stage_answered_questions": current_stage_answered,
+            "show_continuation_prompt": show_continuation
+        }
+
+    async def _finalize_and_respond(
+        self,
+        user_id: str,
+        user_state: Optional[Dict[str, Any]] = None,
+        next_question: Optional[Dict[str, Any]] = None,
+        is_complete: bool = False,
+        skip_continuation: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Resolve the final prompt, continuation prompt and next question into an API response.
+        The next question is only fetched when the caller has not already done so.
+        """
+        if user_state is None:
+            user_state = await self.get_user_state(user_id)
+        
+        if self.should_show_final_prompt(user_state):
+            return self._build_response(user_state, self.COMPLETION_PROMPT, is_complete=True)
+        
+        if not skip_continuation and self.should_show_continuation_prompt(user_state):
+            return self._build_response(user_state, show_continuation=True)
+        
+        if next_question is None and not is_complete:
+            next_question, is_complete, _ = await self.get_next_question_internal(user_id)
+        
+        if is_complete:
+            return self._build_response(user_state, self.COMPLETION_PROMPT, is_complete=True)
+        
+        return self._build_response(user_state, next_question)
+
     async def start_questionnaire(self, user_id: str) -> Dict[str, Any]:
         """
         Start or resume questionnaire.
@@ -964,56 +1333,8 @@ class QuestionnaireService:
             await self.update_user_state(user_id, user_state)
             logger.info(f"User {user_id} continuing with additional questions, skipping continuation prompts")
         
-        show_final = self.should_show_final_prompt(user_state)
-        if show_final:
-            progress = await self.calculate_questionnaire_progress(user_state)
-            current_stage_total, current_stage_answered = await self.get_current_stage_counts(user_state)
-            return {
-                "question": self.COMPLETION_PROMPT,
-                "is_complete": True,
-                "progress": 100.0,
-                "current_stage_total_questions": current_stage_total,
-                "current_stage_answered_questions": current_stage_answered,
-                "show_continuation_prompt": False
-            }
-        
         # Skip continuation prompt if user is continuing with additional questions
-        show_prompt = self.should_show_continuation_prompt(user_state) and not is_continuing_additional
-        if show_prompt and not show_final:
-            progress = await self.calculate_questionnaire_progress(user_state)
-            current_stage_total, current_stage_answered = await self.get_current_stage_counts(user_state)
-            return {
-                "question": None,
-                "is_complete": False,
-                "progress": progress,
-                "current_stage_total_questions": current_stage_total,
-                "current_stage_answered_questions": current_stage_answered,
-                "show_continuation_prompt": True
-            }
-        
-        next_question, is_complete, _ = await self.get_next_question_internal(user_id)
-        
-        if is_complete:
-            return {
-                "question": self.COMPLETION_PROMPT,
-                "is_complete": True,
-                "progress": 100.0,
-                "current_stage_total_questions": 0,
-                "current_stage_answered_questions": 0,
-                "show_continuation_prompt": False
-            }
-        
-        progress = await self.calculate_questionnaire_progress(user_state)
-        current_stage_total, current_stage_answered = await self.get_current_stage_counts(user_state)
-        
-        return {
-            "question": next_question,
-            "is_complete": is_complete,
-            "progress": progress,
-            "current_stage_total_questions": current_stage_total,
-            "current_stage_answered_questions": current_stage_answered,
-            "show_continuation_prompt": False
-        }
+        return await self._finalize_and_respond(user_id, user_state, skip_continuation=is_continuing_additional)
 
     async def submit_answers(self, user_id: str, answers: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -1023,56 +1344,9 @@ class QuestionnaireService:
         next_question, is_complete, is_user_chose_to_continue = await self.get_next_question_internal(
             user_id, answers
         )
-        
-        user_state = await self.get_user_state(user_id)
-        
-        show_final = self.should_show_final_prompt(user_state)
-        if show_final:
-            progress = await self.calculate_questionnaire_progress(user_state)
-            current_stage_total, current_stage_answered = await self.get_current_stage_counts(user_state)
-            return {
-                "question": self.COMPLETION_PROMPT,
-                "is_complete": True,
-                "progress": 100.0,
-                "current_stage_total_questions": current_stage_total,
-                "current_stage_answered_questions": current_stage_answered,
-                "show_continuation_prompt": False
-            }
-        
-        show_prompt = self.should_show_continuation_prompt(user_state)
-        if show_prompt and not is_user_chose_to_continue:
-            progress = await self.calculate_questionnaire_progress(user_state)
-            current_stage_total, current_stage_answered = await self.get_current_stage_counts(user_state)
-            return {
-                "question": None,
-                "is_complete": False,
-                "progress": progress,
-                "current_stage_total_questions": current_stage_total,
-                "current_stage_answered_questions": current_stage_answered,
-                "show_continuation_prompt": True
-            }
-
-        progress = await self.calculate_questionnaire_progress(user_state)
-        current_stage_total, current_stage_answered = await self.get_current_stage_counts(user_state)
-        
-        if is_complete:
-            return {
-                "question": self.COMPLETION_PROMPT,
-                "is_complete": True,
-                "progress": 100.0,
-                "current_stage_total_questions": current_stage_total,
-                "current_stage_answered_questions": current_stage_answered,
-                "show_continuation_prompt": False
-            }
-
-        return {
-            "question": next_question,
-            "is_complete": is_complete,
-            "progress": progress,
-            "current_stage_total_questions": current_stage_total,
-            "current_stage_answered_questions": current_stage_answered,
-            "show_continuation_prompt": False
-        }
+        return await self._finalize_and_respond(
+            user_id, next_question=next_question, is_complete=is_complete, skip_continuation=is_user_chose_to_continue
+        )
 
     async def skip_question(self, user_id: str) -> Dict[str, Any]:
         """
@@ -1086,64 +1360,18 @@ class QuestionnaireService:
         
         # Get the next question
         next_question, is_complete, _ = await self.get_next_question_internal(user_id)
-        
-        user_state = await self.get_user_state(user_id)
-        
-        # Check for completion or continuation prompts
-        show_final = self.should_show_final_prompt(user_state)
-        if show_final:
-            progress = await self.calculate_questionnaire_progress(user_state)
-            current_stage_total, current_stage_answered = await self.get_current_stage_counts(user_state)
-            return {
-                "question": self.COMPLETION_PROMPT,
-                "is_complete": True,
-                "progress": 100.0,
-                "current_stage_total_questions": current_stage_total,
-                "current_stage_answered_questions": current_stage_answered,
-                "show_continuation_prompt": False
-            }
-        
-        show_prompt = self.should_show_continuation_prompt(user_state)
-        if show_prompt:
-            progress = await self.calculate_questionnaire_progress(user_state)
-            current_stage_total, current_stage_answered = await self.get_current_stage_counts(user_state)
-            return {
-                "question": None,
-                "is_complete": False,
-                "progress": progress,
-                "current_stage_total_questions": current_stage_total,
-                "current_stage_answered_questions": current_stage_answered,
-                "show_continuation_prompt": True
-            }
-
-        progress = await self.calculate_questionnaire_progress(user_state)
-        current_stage_total, current_stage_answered = await self.get_current_stage_counts(user_state)
-        
-        if is_complete:
-            return {
-                "question": self.COMPLETION_PROMPT,
-                "is_complete": True,
-                "progress": 100.0,
-                "current_stage_total_questions": current_stage_total,
-                "current_stage_answered_questions": current_stage_answered,
-                "show_continuation_prompt": False
-            }
-
-        return {
-            "question": next_question,
-            "is_complete": is_complete,
-            "progress": progress,
-            "current_stage_total_questions": current_stage_total,
-            "current_stage_answered_questions": current_stage_answered,
-            "show_continuation_prompt": False
-        }
+        return await self._finalize_and_respond(user_id, next_question=next_question, is_complete=is_complete)
 
     async def get_questionnaire_status(self, user_id: str) -> Dict[str, Any]:
         """
         Get questionnaire status.
         Returns a complete response ready for the API endpoint.
         """
-        completed_questionnaire = await self.get_completed_questionnaire(user_id)
+        # The stored-state read has no side effects, so it can overlap the completed lookup
+        completed_questionnaire, user_state = await asyncio.gather(
+            self.get_completed_questionnaire(user_id),
+            self._get_stored_user_state(user_id)
+        )
         
         if completed_questionnaire:
             logger.info(f"User {user_id} has a completed questionnaire in MongoDB")
@@ -1152,9 +1380,12 @@ class QuestionnaireService:
                 "questions_answered": completed_questionnaire.get("question_count", 0),
             }
         
-        user_state = await self.get_user_state(user_id)
-        progress = await self.calculate_questionnaire_progress(user_state)
-        current_stage_total, current_stage_answered = await self.get_current_stage_counts(user_state)
+        if user_state is None:
+            # No state yet: let get_user_state create the initial one
+            user_state = await self.get_user_state(user_id)
+        
+        progress = self.calculate_questionnaire_progress(user_state)
+        current_stage_total, current_stage_answered = self.get_current_stage_counts(user_state)
         
         is_complete = (progress == 100.0 and not user_state.get('queue')) if progress is not None else False
         show_prompt = self.should_show_continuation_prompt(user_state)
@@ -1182,7 +1413,7 @@ class QuestionnaireService:
             user_state['current_question_id'] = None
             
             # Clear the question queue to force repopulation with unanswered questions
-            user_state['queue'] = deque()
+            user_state['queue'] = []
             
             # Add a flag to indicate user wants to continue with additional questions
             user_state['continuing_additional'] = True
@@ -1218,26 +1449,10 @@ class QuestionnaireService:
             price_min = 500  # Default values
             price_max = 15000
             
-            # Map budget_range to price filters
-            if 'budget_range' in user_responses:
-                budget = user_responses['budget_range']
-                if isinstance(budget, list) and len(budget) >= 2:
-                    # budget_range is an array [min, max]
-                    price_min = int(budget[0])
-                    price_max = int(budget[1])
-                elif isinstance(budget, (int, float)):
-                    # Fallback: single value represents max budget
-                    price_max = int(budget)
-                    price_min = int(budget * 0.5)
-                elif isinstance(budget, str):
-                    # Try to parse if it's a string representation
-                    try:
-                        budget_val = int(budget)
-                        price_max = budget_val
-                        price_min = int(budget_val * 0.5)
-                    except ValueError:
-                        logger.warning(f"Could not parse budget_range value: {budget}")
-                        
+            # Map budget_range to price filters (normalized to [min, max] at ingest)
+            budget = user_responses.get('budget_range')
+            if isinstance(budget, list) and len(budget) == 2:
+                price_min, price_max = budget
                 logger.info(f"Mapped budget_range {budget} to price_min={price_min}, price_max={price_max}")
             
             # Map accessibility_needs to Accessibility option
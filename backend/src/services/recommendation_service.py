@@ -3,26 +3,192 @@ Neighborhood Recommendation Service
 Provides neighborhood recommendations based on user questionnaire responses and price preferences.
 """
 
+import asyncio
 import numpy as np
-from typing import Dict, List, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, func
-from sqlalchemy.orm import selectinload
+from sqlalchemy import Float, select, and_, cast, func, lambda_stmt
 import logging
 import json
+import math
 import aiohttp
-import requests
+import orjson
 import hashlib
+import time
+from dataclasses import dataclass
+from functools import cached_property, lru_cache
 from datetime import datetime, timedelta
 from src.config.settings import settings
+from src.database.postgresql_db import get_session_local
 
-from src.database.models import Listing, Neighborhood, NeighborhoodMetrics, NeighborhoodMetadata, ListingMetadata, UserFilters
-from src.services.questionnaire_service import QuestionnaireService
+from src.database.models import Neighborhood, NeighborhoodMetrics, NeighborhoodMetadata, ListingMetadata, UserFilters
+from src.services.questionnaire_service import (
+    FEATURE_NAMES, PREFERENCE_QUESTION_IDS, QuestionnaireService, cache_preference_vector,
+    calculate_preference_vector, get_cached_preference_vector
+)
 from src.database.models import NeighborhoodFeatures, UserPreferenceVector
-from src.utils.cache.redis_client import get_cache, set_cache, delete_cache
+from src.utils.cache.redis_client import get_cache, set_cache, delete_cache, get_many_cache, set_many_cache
 
 logger = logging.getLogger(__name__)
 
+
+@dataclass
+class NeighborhoodColumns:
+    """Neighborhood features and prices stored column-wise, one row per neighborhood."""
+    ids: np.ndarray
+    hebrew_names: List[str]
+    latitudes: np.ndarray
+    longitudes: np.ndarray
+    features: np.ndarray            # (N, features) float32 feature vectors, NaNs set to neutral
+    individual_scores: np.ndarray   # (N, features) per-feature level columns, NaN where missing
+    avg_rental_prices: np.ndarray   # NaN where there is no price data
+
+    def __len__(self) -> int:
+        return len(self.ids)
+    
+    @cached_property
+    def origins(self) -> List[Dict[str, float]]:
+        """Routes API origins, one {'lat', 'lng'} dict per row, built once per loaded columns."""
+        return [
+            {'lat': latitude, 'lng': longitude}
+            for latitude, longitude in zip(self.latitudes.tolist(), self.longitudes.tolist())
+        ]
+
+
+def _nan_to_none(values: List[float]) -> List[Optional[float]]:
+    return [None if value != value else value for value in values]
+
+
+def _feature_match_scores(features: np.ndarray, user_preferences: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """
+    Weighted mean of (1 - |feature - preference|) for every row of the feature matrix.
+    
+    Uses sum(w) - |F - u| @ w so the weighted sum runs as one BLAS matrix-vector
+    product over a single scratch buffer instead of three temporary matrices.
+    """
+    # Compute in the matrix's dtype so a float32 matrix isn't upcast by float64 preferences
+    user_preferences = user_preferences.astype(features.dtype, copy=False)
+    weights = weights.astype(features.dtype, copy=False)
+    differences = np.subtract(features, user_preferences)
+    np.abs(differences, out=differences)
+    weight_total = weights.sum()
+    return (weight_total - differences @ weights) / weight_total
+
+
+# Users scored per batched matmul, bounding the (users, neighborhoods, features) scratch buffer
+FEATURE_SCORE_BATCH_SIZE = 256
+
+
+def _feature_match_scores_batch(features: np.ndarray, user_preferences: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """
+    _feature_match_scores for several users at once, one row of scores per row of preferences.
+    
+    The weighted sums for every user run as one batched matmul over the (users, N, features) differences.
+    """
+    user_preferences = user_preferences.astype(features.dtype, copy=False)
+    weights = weights.astype(features.dtype, copy=False)
+    differences = np.subtract(features[np.newaxis, :, :], user_preferences[:, np.newaxis, :])
+    np.abs(differences, out=differences)
+    weight_totals = weights.sum(axis=1, keepdims=True)
+    return (weight_totals - np.matmul(differences, weights[:, :, np.newaxis])[:, :, 0]) / weight_totals
+
+
+# Neighborhood features and prices change on the order of hours, so the loaded
+# columns are shared by all requests in the process.
+NEIGHBORHOOD_FEATURES_CACHE_TTL_SECONDS = 600
+_neighborhood_features_cache: Dict[str, Any] = {'neighborhoods': None, 'expires_at': 0.0}
+
+
+def invalidate_neighborhood_features_cache() -> None:
+    """Drop the in-process neighborhood features so the next request reloads them."""
+    _neighborhood_features_cache['expires_at'] = 0.0
+
+
+# Neighborhood info and active listing counts are the same for every user; the short TTL
+# keeps the "listings available" counts close to the scraper's updates.
+NEIGHBORHOOD_ENRICHMENT_CACHE_TTL_SECONDS = 60
+
+
+def _neighborhood_enrichment_cache_key(neighborhood_id: int) -> str:
+    return f"neighborhood_enrichment:{neighborhood_id}"
+
+
+def _hash_fields(hasher: Any, *fields: Any) -> None:
+    """Feed fields to a hash, length-prefixed so adjacent fields can't run together."""
+    for field in fields:
+        data = field if isinstance(field, bytes) else str(field).encode()
+        hasher.update(len(data).to_bytes(4, 'little'))
+        hasher.update(data)
+
+
+def _preference_fingerprint(responses: Dict[str, Any]) -> Optional[tuple]:
+    """Hashable view of the answers that feed the preference vector, or None if one can't be hashed."""
+    fingerprint = []
+    for question_id in PREFERENCE_QUESTION_IDS:
+        if question_id in responses:
+            answer = responses[question_id]
+            if isinstance(answer, list):
+                answer = tuple(answer)
+            try:
+                hash(answer)
+            except TypeError:
+                return None
+            fingerprint.append((question_id, answer))
+    return tuple(fingerprint)
+
+
+@lru_cache(maxsize=4096)
+def _cached_preference_vector(fingerprint: tuple) -> np.ndarray:
+    """Preference vector for a response fingerprint, shared read-only between callers."""
+    responses = {
+        question_id: list(answer) if isinstance(answer, tuple) else answer
+        for question_id, answer in fingerprint
+    }
+    preference_vector = calculate_preference_vector(responses)
+    preference_vector.setflags(write=False)
+    return preference_vector
+
+
+# Shared HTTP client for the Google Routes API, so connections and DNS lookups are reused across requests
+ROUTES_API_TIMEOUT_SECONDS = 30
+# Google APIs only gzip responses for clients whose User-Agent contains "gzip"
+ROUTES_API_HEADERS = {'Accept-Encoding': 'gzip', 'User-Agent': 'apt-scanner (gzip)'}
+_routes_http_session: Optional[aiohttp.ClientSession] = None
+
+
+def _get_routes_http_session() -> aiohttp.ClientSession:
+    """Get or create the pooled HTTP session used for Routes API calls."""
+    global _routes_http_session
+    if _routes_http_session is None or _routes_http_session.closed:
+        _routes_http_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=20, ttl_dns_cache=300),
+            timeout=aiohttp.ClientTimeout(total=ROUTES_API_TIMEOUT_SECONDS),
+            headers=ROUTES_API_HEADERS
+        )
+    return _routes_http_session
+
+
+async def close_routes_http_session() -> None:
+    """Close the pooled Routes API HTTP session."""
+    global _routes_http_session
+    if _routes_http_session is not None:
+        await _routes_http_session.close()
+        _routes_http_session = None
+
+
+# Travel times between a neighborhood centroid and a place barely change within a day, and every
+# request uses the same Monday-noon departure time, so route matrix elements are cached per pair.
+ROUTE_CACHE_TTL_SECONDS = 86400
+
+
+def _route_cache_key(origin: Dict, place_id: str, mode: str) -> str:
+    return f"route:{round(origin['lat'], 4)},{round(origin['lng'], 4)}:{place_id}:{mode}"
+
+
+# Number of travel time details returned per neighborhood
+LOCATION_DETAILS_LIMIT = 3
+
+
 def get_monday_noon_reference_time() -> str:
     """
     Get the next Monday at 12:00 PM as a consistent reference time for travel calculations.
@@ -49,25 +215,10 @@ class NeighborhoodRecommendationService:
     def __init__(self):
         self.questionnaire_service = QuestionnaireService()
         
-        # Feature names in order (matching the NeighborhoodFeatures model)
-        self.feature_names = [
-            'cultural_level',           # 0
-            'religiosity_level',        # 1  
-            'communality_level',        # 2
-            'kindergardens_level',      # 3
-            'maintenance_level',        # 4
-            'mobility_level',           # 5
-            'parks_level',              # 6
-            'peaceful_level',           # 7
-            'shopping_level',           # 8
-            'safety_level',             # 9
-            'nightlife_level'           # 10 - Added from the updated model
-        ]
-        
         # Cache settings
         self.cache_ttl = 3600  # 1 hour cache
     
-    def _generate_cache_key(self, user_id: str, user_responses: Optional[Dict] = None, 
+    def _generate_cache_key(self, user_id: str, user_pois: Optional[List[Dict]] = None, 
                            user_price_filters: Optional[Dict] = None, 
                            preference_vector: Optional[np.ndarray] = None) -> str:
         """
@@ -75,35 +226,25 @@ class NeighborhoodRecommendationService:
         
         Args:
             user_id: User's Firebase UID
-            user_responses: User questionnaire responses
+            user_pois: User's validated points of interest
             user_price_filters: User price filters
             preference_vector: User preference vector
             
         Returns:
             Unique cache key string
         """
-        # Create a dictionary with all factors that affect recommendations
-        cache_data = {
-            'user_id': user_id,
-            'price_filters': user_price_filters or {},
-            'preference_vector': preference_vector.tolist() if preference_vector is not None else None,
-        }
-        
-        # Add POIs from responses if available
-        if user_responses and 'points_of_interest' in user_responses:
-            pois = user_responses['points_of_interest']
-            if isinstance(pois, str):
-                try:
-                    pois = json.loads(pois)
-                except:
-                    pois = []
-            cache_data['pois'] = pois
+        # Hash every factor that affects recommendations as compact bytes instead of JSON
+        hasher = hashlib.blake2b(digest_size=16)
+        _hash_fields(hasher, user_id)
+        for key, value in sorted((user_price_filters or {}).items()):
+            _hash_fields(hasher, key, value)
+        _hash_fields(hasher, b'' if preference_vector is None else np.asarray(preference_vector, dtype='<f4').tobytes())
         
-        # Create hash of the data for unique key
-        cache_string = json.dumps(cache_data, sort_keys=True)
-        cache_hash = hashlib.md5(cache_string.encode()).hexdigest()
+        # POI order matters, since location details follow it
+        for poi in user_pois or ():
+            _hash_fields(hasher, poi['place_id'], poi['max_time'], poi['mode'], poi['description'])
         
-        return f"recommendations:{user_id}:{cache_hash}"
+        return f"recommendations:{user_id}:{hasher.hexdigest()}"
     
     def _get_cached_recommendations(self, cache_key: str, top_k: int) -> Optional[List[Dict]]:
         """
@@ -156,30 +297,7 @@ class NeighborhoodRecommendationService:
         except Exception as e:
             logger.error(f"Error caching recommendations: {e}")
             return False
-        
-        # Importance scale mapping
-        self.importance_scale = {
-            'Very important': 0.9,
-            'Somewhat important': 0.6,
-            'Not important': 0.1,
-            'Yes, I want to be in the center of the action': 0.9,
-            'Close but not too close': 0.6,
-            'As far as possible': 0.1,
-            'No preference': 0.5,
-            'Walking distance': 0.9,
-            'Short drive or public transport ride': 0.6,
-            'Very important - I want well-maintained buildings': 0.9,
-            'Not important - I don\'t mind older/less maintained areas': 0.1,
-            'Very important - I need a quiet area': 0.9,
-            'Not important - I don\'t mind noise': 0.1,
-            'Very important - I want an active, connected community': 0.9,
-            'Not important - I prefer privacy': 0.2,
-            'No': 0.1,
-            'Yes': 0.9,
-            'Yes, I\'m willing to compromise': 0.1,
-            'No, I want a safe neighborhood': 0.9
-        }
-    
+
     async def get_neighborhood_recommendations(
         self, 
         db: AsyncSession, 
@@ -200,101 +318,224 @@ class NeighborhoodRecommendationService:
             List of recommended neighborhoods with scores and sample listings
         """
         try:
-            # Get user's price preferences
-            user_price_filters = await self._get_user_price_filters(db, user_id)
-            
-            # Get preference vector (cached or calculated)
-            preference_vector = await self._get_cached_preference_vector(db, user_id)
-            user_responses = None
-            
-            if preference_vector is None:
-                # Fallback: Get user's questionnaire responses and calculate vector
-                user_responses = await self.questionnaire_service.get_user_responses(db, user_id)
-                if not user_responses:
-                    logger.warning(f"No questionnaire responses found for user {user_id}")
-                    return []
-                
-                # Convert responses to preference vector
-                preference_vector = self._create_preference_vector(user_responses)
-                logger.info(f"Calculated preference vector from responses for user {user_id}: {preference_vector}")
-            else:
-                # Get responses for POI data even if we have cached vector
-                user_responses = await self.questionnaire_service.get_user_responses(db, user_id)
-                logger.info(f"Using cached preference vector for user {user_id}: {preference_vector}")
-            
-            # Generate cache key based on all user preferences
-            cache_key = self._generate_cache_key(user_id, user_responses, user_price_filters, preference_vector)
-            
-            # Try to get from cache first
-            if use_cache:
-                cached_recommendations = self._get_cached_recommendations(cache_key, top_k)
-                if cached_recommendations is not None:
-                    logger.info(f"🚀 Returning {len(cached_recommendations)} cached recommendations for user {user_id}")
-                    return cached_recommendations
-            
-            logger.info(f"🔄 Cache miss - calculating fresh recommendations for user {user_id}")
-            
-            # Get user's points of interest
-            user_pois = self._get_user_pois(user_responses) if user_responses else []
-            logger.info(f"Found {len(user_pois)} POIs for user {user_id}: {user_pois}")
-            
-            # Get neighborhood features from database
-            neighborhood_features = await self._get_neighborhood_features_with_prices(db)
-            if not neighborhood_features:
-                logger.error("No neighborhood features found in database")
-                return []
-            
-            # Calculate location scores if user has POIs
-            location_scores = {}
-            if user_pois:
-                logger.info(f"Calculating location scores for {len(user_pois)} POIs")
-                try:
-                    location_scores = await self._get_location_scores(neighborhood_features, user_pois)
-                    if location_scores:
-                        logger.info(f"Generated location scores for {len(location_scores)} neighborhoods")
-                    else:
-                        logger.warning("Location scoring failed - continuing with feature and price scoring only")
-                except Exception as e:
-                    logger.error(f"Error in location scoring: {e} - continuing without location scores")
-                    location_scores = {}
-            else:
-                logger.info("No POIs found, skipping location scoring")
-            
-            # Score neighborhoods with enhanced algorithm including location scores
-            scored_neighborhoods = self._score_neighborhoods(
-                neighborhood_features, 
-                preference_vector, 
-                user_price_filters,
-                location_scores
+            # Price preferences, the cached preference vector, the responses (needed for POI data
+            # either way) and the neighborhood features are independent, so fetch them concurrently.
+            # The price filters and features use their own sessions because an AsyncSession can only
+            # run one statement at a time; responses come from MongoDB. The features are normally
+            # served from the in-process cache, so loading them ahead of the Redis check is cheap.
+            user_price_filters, preference_vector, user_responses, neighborhood_features = await asyncio.gather(
+                self._run_in_new_session(self._get_user_price_filters, user_id),
+                self._get_cached_preference_vector(db, user_id),
+                self.questionnaire_service.get_user_responses(db, user_id),
+                self._run_in_new_session(self._get_neighborhood_features_with_prices)
             )
             
-            # Get ALL top recommendations (we'll cache more than requested for future use)
-            all_top_neighborhoods = sorted(scored_neighborhoods, key=lambda x: x['total_score'], reverse=True)[:10]
-            
-            # Enrich with listings and additional info
-            all_recommendations = await self._enrich_recommendations(db, all_top_neighborhoods)
-            
-            # Cache the top 10 recommendations for future use
-            if use_cache and len(all_recommendations) > 0:
-                self._cache_recommendations(cache_key, all_recommendations)
+            return await self._recommend_for_user(
+                db, user_id, top_k, use_cache,
+                user_price_filters, preference_vector, user_responses, neighborhood_features
+            )
             
-            # Return only the requested number
-            recommendations = all_recommendations[:top_k]
+        except Exception as e:
+            logger.error(f"Error generating recommendations for user {user_id}: {e}", exc_info=True)
+            return []
+
+    async def get_neighborhood_recommendations_batch(
+        self,
+        db: AsyncSession,
+        user_ids: List[str],
+        top_k: int = 10,
+        use_cache: bool = True
+    ) -> Dict[str, List[Dict]]:
+        """
+        Get recommendations for several users, e.g. to warm the cache after a bulk update.
+        
+        Price filters and stored preference vectors are loaded for all users with one query each
+        and the neighborhood features once, instead of a set of lookups per user.
+        
+        Args:
+            db: Database session
+            user_ids: Users' Firebase UIDs
+            top_k: Number of recommendations to return per user
+            use_cache: Whether to use Redis caching
             
-            logger.info(f"Generated {len(recommendations)} recommendations for user {user_id} (cached {len(all_recommendations)} total)")
-            return recommendations
+        Returns:
+            Recommendations keyed by user id, empty for users without any
+        """
+        user_ids = list(dict.fromkeys(user_ids))
+        if not user_ids:
+            return {}
+        
+        try:
+            users_price_filters, preference_vectors, neighborhood_features, users_responses = await asyncio.gather(
+                self._run_in_new_session(self._get_users_price_filters, user_ids),
+                self._get_cached_preference_vectors(db, user_ids),
+                self._run_in_new_session(self._get_neighborhood_features_with_prices),
+                asyncio.gather(*(self.questionnaire_service.get_user_responses(db, user_id) for user_id in user_ids))
+            )
+        except Exception as e:
+            logger.error(f"Error loading batch recommendation inputs for {len(user_ids)} users: {e}", exc_info=True)
+            return {user_id: [] for user_id in user_ids}
+        
+        # Users without a stored vector get one from their responses, so every user can be scored together
+        for user_id, user_responses in zip(user_ids, users_responses):
+            if preference_vectors.get(user_id) is None and user_responses:
+                preference_vectors[user_id] = self._create_preference_vector(user_responses)
+        users_feature_scores = self._batch_feature_scores(neighborhood_features, preference_vectors)
+        
+        recommendations = {}
+        for user_id, user_responses in zip(user_ids, users_responses):
+            try:
+                recommendations[user_id] = await self._recommend_for_user(
+                    db, user_id, top_k, use_cache,
+                    users_price_filters[user_id], preference_vectors.get(user_id), user_responses, neighborhood_features,
+                    feature_scores=users_feature_scores.get(user_id)
+                )
+            except Exception as e:
+                logger.error(f"Error generating recommendations for user {user_id}: {e}", exc_info=True)
+                recommendations[user_id] = []
+        
+        logger.info("Generated batch recommendations for %d users", len(user_ids))
+        return recommendations
+
+    def _batch_feature_scores(
+        self,
+        neighborhoods: Optional[NeighborhoodColumns],
+        preference_vectors: Dict[str, np.ndarray]
+    ) -> Dict[str, np.ndarray]:
+        """
+        Feature match scores of every neighborhood for several users, a batched matmul per chunk of users.
+        
+        Args:
+            neighborhoods: Loaded neighborhood columns
+            preference_vectors: Preference vectors keyed by user id
             
+        Returns:
+            Feature scores keyed by user id, empty if there is nothing to score
+        """
+        if not neighborhoods or not preference_vectors:
+            return {}
+        
+        user_ids = list(preference_vectors)
+        users_feature_scores = {}
+        try:
+            for start in range(0, len(user_ids), FEATURE_SCORE_BATCH_SIZE):
+                batch_user_ids = user_ids[start:start + FEATURE_SCORE_BATCH_SIZE]
+                user_preferences = np.stack([
+                    self._sanitize_preferences(preference_vectors[user_id]) for user_id in batch_user_ids
+                ])
+                weights = np.maximum(user_preferences, 0.1)
+                scores = _feature_match_scores_batch(neighborhoods.features, user_preferences, weights)
+                users_feature_scores.update(zip(batch_user_ids, scores))
         except Exception as e:
-            logger.error(f"Error generating recommendations for user {user_id}: {e}", exc_info=True)
+            # Users without batch scores are scored individually
+            logger.error(f"Error batch scoring features for {len(user_ids)} users: {e}", exc_info=True)
+        return users_feature_scores
+
+    async def _recommend_for_user(
+        self,
+        db: AsyncSession,
+        user_id: str,
+        top_k: int,
+        use_cache: bool,
+        user_price_filters: Dict,
+        preference_vector: Optional[np.ndarray],
+        user_responses: Optional[Dict[str, Any]],
+        neighborhood_features: Optional[NeighborhoodColumns],
+        feature_scores: Optional[np.ndarray] = None
+    ) -> List[Dict]:
+        """Score, enrich and cache one user's recommendations from their already loaded inputs."""
+        if preference_vector is None:
+            # Fallback: calculate the vector from the user's questionnaire responses
+            if not user_responses:
+                logger.warning(f"No questionnaire responses found for user {user_id}")
+                return []
+            
+            # Convert responses to preference vector
+            preference_vector = self._create_preference_vector(user_responses)
+            logger.info("Calculated preference vector from responses for user %s", user_id)
+        else:
+            logger.info("Using cached preference vector for user %s", user_id)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Preference vector for user %s: %s", user_id, preference_vector)
+        
+        # Get user's points of interest, parsed once for both the cache key and location scoring
+        user_pois = self._get_user_pois(user_responses) if user_responses else []
+        
+        # Generate cache key based on all user preferences
+        cache_key = self._generate_cache_key(user_id, user_pois, user_price_filters, preference_vector)
+        
+        # Try to get from cache first
+        if use_cache:
+            cached_recommendations = self._get_cached_recommendations(cache_key, top_k)
+            if cached_recommendations is not None:
+                logger.info(f"🚀 Returning {len(cached_recommendations)} cached recommendations for user {user_id}")
+                return cached_recommendations
+        
+        logger.info(f"🔄 Cache miss - calculating fresh recommendations for user {user_id}")
+        
+        logger.info("Found %d POIs for user %s", len(user_pois), user_id)
+        if user_pois and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("POIs for user %s: %s", user_id, user_pois)
+        
+        if not neighborhood_features:
+            logger.error("No neighborhood features found in database")
             return []
+        
+        # Calculate location scores if user has POIs
+        location_scores = {}
+        if user_pois:
+            logger.info(f"Calculating location scores for {len(user_pois)} POIs")
+            try:
+                location_scores = await self._get_location_scores(neighborhood_features, user_pois)
+                if location_scores:
+                    logger.info(f"Generated location scores for {len(location_scores)} neighborhoods")
+                else:
+                    logger.warning("Location scoring failed - continuing with feature and price scoring only")
+            except Exception as e:
+                logger.error(f"Error in location scoring: {e} - continuing without location scores")
+                location_scores = {}
+        else:
+            logger.info("No POIs found, skipping location scoring")
+        
+        # Score neighborhoods with enhanced algorithm including location scores and
+        # keep the top 10 (we'll cache more than requested for future use)
+        all_top_neighborhoods = self._score_neighborhoods(
+            neighborhood_features, 
+            preference_vector, 
+            user_price_filters,
+            location_scores,
+            top_k=10,
+            feature_scores=feature_scores
+        )
+        
+        # Enrich with listings and additional info
+        all_recommendations = await self._enrich_recommendations(db, all_top_neighborhoods)
+        
+        # Cache the top 10 recommendations for future use
+        if use_cache and len(all_recommendations) > 0:
+            self._cache_recommendations(cache_key, all_recommendations)
+        
+        # Return only the requested number
+        recommendations = all_recommendations[:top_k]
+        
+        logger.info(f"Generated {len(recommendations)} recommendations for user {user_id} (cached {len(all_recommendations)} total)")
+        return recommendations
 
+    async def _run_in_new_session(self, fetch: Callable[..., Awaitable[Any]], *args: Any) -> Any:
+        """Run fetch(session, *args) on a short-lived session so it can overlap with the request's session."""
+        async with get_session_local()() as session:
+            return await fetch(session, *args)
+    
     async def _get_user_price_filters(self, db: AsyncSession, user_id: str) -> Optional[Dict]:
         """Get user's price preferences from UserFilters."""
         try:
-            result = await db.execute(
-                select(UserFilters).where(UserFilters.user_id == user_id)
-            )
-            filters = result.scalar_one_or_none()
+            # Only the price columns are needed, so skip loading the full UserFilters entity.
+            # Built as a lambda statement so the expression is constructed and compiled once.
+            result = await db.execute(lambda_stmt(
+                lambda: select(UserFilters.price_min, UserFilters.price_max, UserFilters.type)
+                .where(UserFilters.user_id == user_id)
+            ))
+            filters = result.one_or_none()
             
             if filters:
                 return {
@@ -314,151 +555,33 @@ class NeighborhoodRecommendationService:
             logger.error(f"Error fetching user price filters for {user_id}: {e}")
             return {'price_min': 500, 'price_max': 20000, 'type': 'rent'}
     
+    async def _get_users_price_filters(self, db: AsyncSession, user_ids: List[str]) -> Dict[str, Dict]:
+        """Get several users' price preferences from UserFilters in one query, keyed by user id."""
+        default_filters = {'price_min': 500, 'price_max': 20000, 'type': 'rent'}
+        users_price_filters = {user_id: dict(default_filters) for user_id in user_ids}
+        try:
+            result = await db.execute(
+                select(UserFilters.user_id, UserFilters.price_min, UserFilters.price_max, UserFilters.type)
+                .where(UserFilters.user_id.in_(user_ids))
+            )
+            for user_id, price_min, price_max, filter_type in result.all():
+                users_price_filters[user_id] = {
+                    'price_min': price_min,
+                    'price_max': price_max,
+                    'type': filter_type or 'rent'
+                }
+        except Exception as e:
+            logger.error(f"Error fetching price filters for {len(user_ids)} users: {e}")
+        return users_price_filters
+    
     def _create_preference_vector(self, responses: Dict[str, any]) -> np.ndarray:
         """Convert questionnaire responses to preference vector."""
-        preferences = {feature: 0.5 for feature in self.feature_names}  # Default neutral
-        
-        # Apply mapping logic
-        self._map_basic_questions(responses, preferences)
-        self._map_dynamic_questions(responses, preferences)
-        self._apply_persona_logic(responses, preferences)
-        
-        # Convert to array
-        preference_vector = np.array([preferences[feature] for feature in self.feature_names])
-        return preference_vector
-    
-    def _map_basic_questions(self, responses: Dict, preferences: Dict):
-        """Map basic information questions."""
-        if 'religious_community_importance' in responses:
-            importance = self.importance_scale.get(responses['religious_community_importance'], 0.5)
-            preferences['religiosity_level'] = importance
-        
-        if 'safety_priority' in responses:
-            importance = self.importance_scale.get(responses['safety_priority'], 0.5)
-            preferences['safety_level'] = importance
-        
-        if 'commute_pref' in responses:
-            commute_type = responses['commute_pref']
-            if commute_type in ['Public transport', 'Walking']:
-                preferences['mobility_level'] = 0.8
-            elif commute_type in ['Bicycle / scooter']:
-                preferences['mobility_level'] = 0.7
-            elif commute_type == 'Private car':
-                preferences['mobility_level'] = 0.4
-    
-    def _map_dynamic_questions(self, responses: Dict, preferences: Dict):
-        """Map dynamic questionnaire questions."""
-        # Children ages -> affects multiple features
-        if 'children_ages' in responses:
-            children_ages = responses['children_ages']
-            if isinstance(children_ages, list):
-                children_ages = children_ages[0] if children_ages else 'No children'
-            
-            if 'No children' not in children_ages:
-                preferences['safety_level'] = max(preferences['safety_level'], 0.8)
-                preferences['kindergardens_level'] = max(preferences['kindergardens_level'], 0.7)
-                preferences['peaceful_level'] = max(preferences['peaceful_level'], 0.7)
-        
-        # Learning spaces -> cultural_level
-        if 'learning_space_nearby' in responses:
-            importance = self.importance_scale.get(responses['learning_space_nearby'], 0.5)
-            preferences['cultural_level'] = max(preferences['cultural_level'], importance)
-        
-        # Shopping centers -> shopping_level
-        if 'proximity_to_shopping_centers' in responses:
-            importance = self.importance_scale.get(responses['proximity_to_shopping_centers'], 0.5)
-            preferences['shopping_level'] = importance
-        
-        # Green spaces -> parks_level
-        if 'proximity_to_green_spaces' in responses:
-            importance = self.importance_scale.get(responses['proximity_to_green_spaces'], 0.5)
-            preferences['parks_level'] = importance
-        
-        # Family activities -> communality_level
-        if 'family_activities_nearby' in responses:
-            importance = self.importance_scale.get(responses['family_activities_nearby'], 0.5)
-            preferences['communality_level'] = max(preferences['communality_level'], importance)
-        
-        # Nightlife -> nightlife_level and peaceful_level (inverse)
-        if 'nightlife_proximity' in responses:
-            response = responses['nightlife_proximity']
-            if response == 'Yes, I want to be in the center of the action':
-                preferences['nightlife_level'] = max(preferences['nightlife_level'], 0.9)
-                preferences['cultural_level'] = max(preferences['cultural_level'], 0.9)
-                preferences['peaceful_level'] = min(preferences['peaceful_level'], 0.3)
-            elif response == 'Close but not too close':
-                preferences['nightlife_level'] = max(preferences['nightlife_level'], 0.6)
-                preferences['cultural_level'] = max(preferences['cultural_level'], 0.6)
-                preferences['peaceful_level'] = 0.6
-            elif response == 'As far as possible':
-                preferences['nightlife_level'] = min(preferences['nightlife_level'], 0.2)
-                preferences['cultural_level'] = min(preferences['cultural_level'], 0.2)
-                preferences['peaceful_level'] = max(preferences['peaceful_level'], 0.9)
-        
-        # Community involvement -> communality_level
-        if 'community_involvement_preference' in responses:
-            importance = self.importance_scale.get(responses['community_involvement_preference'], 0.5)
-            preferences['communality_level'] = max(preferences['communality_level'], importance)
-        
-        # Cultural activities -> cultural_level
-        if 'cultural_activities_importance' in responses:
-            importance = self.importance_scale.get(responses['cultural_activities_importance'], 0.5)
-            preferences['cultural_level'] = max(preferences['cultural_level'], importance)
-        
-        # Neighborhood quality -> maintenance_level
-        if 'neighborhood_quality_importance' in responses:
-            importance = self.importance_scale.get(responses['neighborhood_quality_importance'], 0.5)
-            preferences['maintenance_level'] = importance
-        
-        # Building condition -> maintenance_level
-        if 'building_condition_preference' in responses:
-            importance = self.importance_scale.get(responses['building_condition_preference'], 0.5)
-            preferences['maintenance_level'] = max(preferences['maintenance_level'], importance)
-        
-        # Quiet hours -> peaceful_level
-        if 'quiet_hours_importance' in responses:
-            importance = self.importance_scale.get(responses['quiet_hours_importance'], 0.5)
-            preferences['peaceful_level'] = max(preferences['peaceful_level'], importance)
-        
-        # Pet ownership -> parks_level
-        if 'pet_ownership' in responses:
-            if responses['pet_ownership'] == 'Yes':
-                preferences['parks_level'] = max(preferences['parks_level'], 0.7)
-    
-    def _apply_persona_logic(self, responses: Dict, preferences: Dict):
-        """Apply logic based on housing purpose (user persona)."""
-        if 'housing_purpose' not in responses:
-            return
-        
-        housing_purpose = responses['housing_purpose']
-        if isinstance(housing_purpose, list):
-            housing_purpose = housing_purpose[0] if housing_purpose else ''
-        
-        # Adjust preferences based on persona
-        if 'Just me' in housing_purpose:
-            preferences['cultural_level'] = max(preferences['cultural_level'], 0.6)
-            preferences['shopping_level'] = max(preferences['shopping_level'], 0.6)
-            preferences['mobility_level'] = max(preferences['mobility_level'], 0.6)
-            preferences['nightlife_level'] = max(preferences['nightlife_level'], 0.6)
-            
-        elif 'With a partner' in housing_purpose:
-            preferences['cultural_level'] = max(preferences['cultural_level'], 0.6)
-            preferences['peaceful_level'] = max(preferences['peaceful_level'], 0.6)
-            preferences['shopping_level'] = max(preferences['shopping_level'], 0.6)
-            
-        elif 'With family (and children)' in housing_purpose:
-            preferences['safety_level'] = max(preferences['safety_level'], 0.8)
-            preferences['kindergardens_level'] = max(preferences['kindergardens_level'], 0.7)
-            preferences['parks_level'] = max(preferences['parks_level'], 0.7)
-            preferences['peaceful_level'] = max(preferences['peaceful_level'], 0.7)
-            preferences['communality_level'] = max(preferences['communality_level'], 0.6)
-            preferences['nightlife_level'] = min(preferences['nightlife_level'], 0.3)  # Families typically avoid nightlife areas
-            
-        elif 'With roommates' in housing_purpose:
-            preferences['cultural_level'] = max(preferences['cultural_level'], 0.7)
-            preferences['shopping_level'] = max(preferences['shopping_level'], 0.6)
-            preferences['mobility_level'] = max(preferences['mobility_level'], 0.7)
-            preferences['nightlife_level'] = max(preferences['nightlife_level'], 0.7)
+        # Same table-driven mapping the questionnaire uses for stored preference vectors,
+        # memoized on the answers it reads
+        fingerprint = _preference_fingerprint(responses)
+        if fingerprint is None:
+            return calculate_preference_vector(responses)
+        return _cached_preference_vector(fingerprint)
     
     def _get_user_pois(self, responses: Dict) -> List[Dict]:
         """
@@ -499,7 +622,7 @@ class NeighborhoodRecommendationService:
                             'description': poi.get('description', '')
                         })
             
-            logger.info(f"Extracted {len(validated_pois)} valid POIs from responses")
+            logger.debug("Extracted %d valid POIs from responses", len(validated_pois))
             return validated_pois
             
         except (json.JSONDecodeError, TypeError, KeyError) as e:
@@ -508,91 +631,170 @@ class NeighborhoodRecommendationService:
     
 
 
-    async def _get_neighborhood_features_with_prices(self, db: AsyncSession) -> List[Dict]:
-        """Get neighborhood features with average rental prices from database."""
+    async def _get_neighborhood_features_with_prices(self, db: AsyncSession) -> Optional[NeighborhoodColumns]:
+        """Get neighborhood features with average rental prices, cached in-process for a few minutes."""
+        if time.monotonic() < _neighborhood_features_cache['expires_at']:
+            return _neighborhood_features_cache['neighborhoods']
+        
         try:
-            # Join NeighborhoodFeatures with Neighborhood and NeighborhoodMetrics to get prices and coordinates
+            # Join NeighborhoodFeatures with Neighborhood and NeighborhoodMetrics to get prices and coordinates,
+            # selecting plain columns so rows come back as tuples instead of ORM entities
             result = await db.execute(
                 select(
-                    NeighborhoodFeatures,
+                    NeighborhoodFeatures.neighborhood_id,
+                    NeighborhoodFeatures.feature_vector,
                     Neighborhood.hebrew_name,
                     Neighborhood.latitude,
                     Neighborhood.longitude,
-                    NeighborhoodMetrics.avg_rental_price
+                    # DECIMAL columns cast in SQL so asyncpg decodes floats instead of building Decimals
+                    cast(NeighborhoodMetrics.avg_rental_price, Float).label('avg_rental_price'),
+                    *(getattr(NeighborhoodFeatures, feature) for feature in FEATURE_NAMES)
                 )
+                .select_from(NeighborhoodFeatures)
                 .join(Neighborhood, NeighborhoodFeatures.neighborhood_id == Neighborhood.id)
                 .join(NeighborhoodMetrics, Neighborhood.id == NeighborhoodMetrics.neighborhood_id, isouter=True)
             )
-            features_with_data = result.fetchall()
-            
-            neighborhood_data = []
-            for feature, hebrew_name, latitude, longitude, avg_rental_price in features_with_data:
-                if feature.feature_vector and latitude and longitude:
-                    neighborhood_data.append({
-                        'neighborhood_id': feature.neighborhood_id,
-                        'hebrew_name': hebrew_name,
-                        'latitude': float(latitude),
-                        'longitude': float(longitude),
-                        'feature_vector': np.array(feature.feature_vector),
-                        'avg_rental_price': float(avg_rental_price) if avg_rental_price else None,
-                        'individual_scores': {
-                            'cultural_level': feature.cultural_level,
-                            'religiosity_level': feature.religiosity_level,
-                            'communality_level': feature.communality_level,
-                            'kindergardens_level': feature.kindergardens_level,
-                            'maintenance_level': feature.maintenance_level,
-                            'mobility_level': feature.mobility_level,
-                            'parks_level': feature.parks_level,
-                            'peaceful_level': feature.peaceful_level,
-                            'shopping_level': feature.shopping_level,
-                            'safety_level': feature.safety_level,
-                            'nightlife_level': feature.nightlife_level  # Added nightlife level
-                        }
-                    })
             
-            return neighborhood_data
+            ids, hebrew_names, latitudes, longitudes = [], [], [], []
+            feature_vectors, individual_scores, avg_rental_prices = [], [], []
+            for (neighborhood_id, feature_vector, hebrew_name,
+                 latitude, longitude, avg_rental_price, *feature_levels) in result.all():
+                if feature_vector and latitude and longitude:
+                    ids.append(neighborhood_id)
+                    hebrew_names.append(hebrew_name)
+                    # Float columns, already decoded as Python floats
+                    latitudes.append(latitude)
+                    longitudes.append(longitude)
+                    feature_vectors.append(feature_vector)
+                    individual_scores.append(feature_levels)
+                    avg_rental_prices.append(avg_rental_price or np.nan)
+            
+            if not ids:
+                return None
+            
+            neighborhoods = NeighborhoodColumns(
+                ids=np.array(ids),
+                hebrew_names=hebrew_names,
+                latitudes=np.array(latitudes, dtype=float),
+                longitudes=np.array(longitudes, dtype=float),
+                features=self._stack_feature_vectors(ids, feature_vectors, len(FEATURE_NAMES)),
+                individual_scores=np.array(individual_scores, dtype=float),
+                avg_rental_prices=np.array(avg_rental_prices)
+            )
+            # Shared across requests
+            for column in (neighborhoods.features, neighborhoods.individual_scores, neighborhoods.avg_rental_prices):
+                column.setflags(write=False)
+            _neighborhood_features_cache.update(
+                neighborhoods=neighborhoods,
+                expires_at=time.monotonic() + NEIGHBORHOOD_FEATURES_CACHE_TTL_SECONDS
+            )
+            
+            return neighborhoods
             
         except Exception as e:
             logger.error(f"Error fetching neighborhood features with prices: {e}", exc_info=True)
-            return []
+            return None
         
-    def _calculate_price_affordability_score(
+    def _calculate_price_affordability_scores(
         self,
-        avg_rental_price: Optional[float],
+        avg_rental_prices: np.ndarray,
         user_price_range: Dict[str, float]
-    ) -> float:
-        if not avg_rental_price:
-            return 0.3  # neutral when no price data
-
+    ) -> np.ndarray:
+        """Score a column of average rental prices against the user's price range in one pass."""
         user_min = user_price_range["price_min"]
         user_max = user_price_range["price_max"]
         user_mid = (user_min + user_max) / 2
         user_range = user_max - user_min or 1
-        # Perfect zone
-        if user_min <= avg_rental_price <= user_max:
-            distance_from_mid = abs(avg_rental_price - user_mid)
-            normalized_distance = distance_from_mid / (user_range / 2)
-            return max(0.75, 1.0 - normalized_distance * 0.25)
-
         buffer = 0.2  # 20% buffer zone
+        lower_limit = user_min * (1 - buffer)
+        upper_limit = user_max * (1 + buffer)
 
-        if avg_rental_price < user_min:
-            limit = user_min * (1 - buffer)
-            if avg_rental_price >= limit:
-                underrun = (user_min - avg_rental_price) / user_min
-                return max(0.75, 1.0 - underrun * 0.25)
-            underrun = (limit - avg_rental_price) / user_min
-            return max(0.05, 0.6 - underrun * 0.55)
+        prices = avg_rental_prices
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Perfect zone
+            in_range_scores = np.maximum(0.75, 1.0 - np.abs(prices - user_mid) / (user_range / 2) * 0.25)
+            below_scores = np.where(
+                prices >= lower_limit,
+                np.maximum(0.75, 1.0 - (user_min - prices) / user_min * 0.25),
+                np.maximum(0.05, 0.6 - (lower_limit - prices) / user_min * 0.55)
+            )
+            above_scores = np.where(
+                prices <= upper_limit,
+                np.maximum(0.75, 1.0 - (prices - user_max) / user_max * 0.25),
+                np.maximum(0.05, 0.6 - (prices - upper_limit) / user_max * 0.55)
+            )
 
-        else:
-            limit = user_max * (1 + buffer)
-            if avg_rental_price <= limit:
-                overrun = (avg_rental_price - user_max) / user_max
-                return max(0.75, 1.0 - overrun * 0.25)
-            overrun = (avg_rental_price - limit) / user_max
-            return max(0.05, 0.6 - overrun * 0.55)
+        scores = np.where(
+            (prices >= user_min) & (prices <= user_max),
+            in_range_scores,
+            np.where(prices < user_min, below_scores, above_scores)
+        )
+        # Neutral when no price data
+        missing = np.isnan(prices) | (prices == 0)
+        scores[missing] = 0.3
+        # Prices stay float64 for display; the scores join the float32 scoring arrays
+        return scores.astype(np.float32)
 
-    def _call_google_routes_api(self, origins: List[Dict], destinations: List[str], mode: str) -> Optional[Dict]:
+    async def _get_route_matrix(self, origins: List[Dict], destinations: List[str], mode: str) -> Optional[Dict]:
+        """
+        Get the route matrix for origins x destinations, reading elements through the Redis route cache.
+        Only destinations with at least one uncached origin are sent to the Routes API.
+        
+        Args:
+            origins: List of origin coordinates with lat and lng
+            destinations: List of destination place IDs
+            mode: Travel mode
+            
+        Returns:
+            Route matrix in Distance Matrix format, or None if no elements are available
+        """
+        cache_keys = [
+            [_route_cache_key(origin, place_id, mode) for place_id in destinations]
+            for origin in origins
+        ]
+        cached_elements = get_many_cache([key for row_keys in cache_keys for key in row_keys])
+        num_destinations = len(destinations)
+        rows = [
+            cached_elements[origin_idx * num_destinations:(origin_idx + 1) * num_destinations]
+            for origin_idx in range(len(origins))
+        ]
+        
+        missing_destinations = [
+            dest_idx for dest_idx in range(num_destinations)
+            if any(row[dest_idx] is None for row in rows)
+        ]
+        logger.info("Route cache for mode %s: %d of %d destinations need the Routes API",
+                    mode, len(missing_destinations), num_destinations)
+        
+        if missing_destinations:
+            data = await self._call_google_routes_api(
+                origins, [destinations[dest_idx] for dest_idx in missing_destinations], mode
+            )
+            fetched_rows = data.get('rows', []) if data else []
+            if not fetched_rows and len(missing_destinations) == num_destinations:
+                return data
+            
+            new_cache_entries = {}
+            for origin_idx, row in enumerate(rows):
+                fetched = fetched_rows[origin_idx]['elements'] if origin_idx < len(fetched_rows) else []
+                for fetched_idx, dest_idx in enumerate(missing_destinations):
+                    element = fetched[fetched_idx] if fetched_idx < len(fetched) else {"status": "NOT_FOUND"}
+                    row[dest_idx] = element
+                    # Only successful routes are cached; failures may be transient
+                    if element.get('status') == 'OK':
+                        new_cache_entries[cache_keys[origin_idx][dest_idx]] = element
+            
+            if new_cache_entries:
+                set_many_cache(new_cache_entries, ROUTE_CACHE_TTL_SECONDS)
+        
+        return {
+            "status": "OK",
+            "origin_addresses": [f"{o['lat']},{o['lng']}" for o in origins],
+            "destination_addresses": destinations,
+            "rows": [{"elements": row} for row in rows]
+        }
+
+    async def _call_google_routes_api(self, origins: List[Dict], destinations: List[str], mode: str) -> Optional[Dict]:
         """
         Call Google Routes API (computeRouteMatrix) - the new replacement for Distance Matrix API.
         
@@ -680,15 +882,19 @@ class NeighborhoodRecommendationService:
             
             logger.info(f"Calling Google Routes API (computeRouteMatrix) for mode {mode}")
             
-            response = requests.post(url, json=request_body, headers=headers, timeout=30)
+            # orjson serializes the coordinate-heavy body and parses the matrix response much faster than json
+            session = _get_routes_http_session()
+            async with session.post(url, data=orjson.dumps(request_body), headers=headers) as response:
+                status_code = response.status
+                response_body = await response.read()
             
-            if response.status_code != 200:
-                error_text = response.text
-                logger.error(f"Google Routes API error {response.status_code}: {error_text}")
+            if status_code != 200:
+                response_text = response_body.decode('utf-8', errors='replace')
+                logger.error(f"Google Routes API error {status_code}: {response_text}")
                 
                 # Try to parse error details
                 try:
-                    error_data = response.json()
+                    error_data = json.loads(response_text)
                     if "error" in error_data:
                         error_message = error_data["error"].get("message", "Unknown error")
                         logger.error(f"Google Routes API detailed error: {error_message}")
@@ -701,14 +907,14 @@ class NeighborhoodRecommendationService:
                     
                 return None
             
-            data = response.json()
+            data = orjson.loads(response_body)
             logger.info(f"Google Routes API response received successfully for {routes_mode} mode")
             
             # Convert Routes API response to Distance Matrix format for compatibility
             converted_response = self._convert_routes_to_distance_matrix_format(data, origins, destinations)
             return converted_response
                 
-        except requests.RequestException as e:
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
             logger.error(f"Error calling Google Routes API: {e}")
             return None
         except Exception as e:
@@ -737,8 +943,21 @@ class NeighborhoodRecommendationService:
             }
             
             # Debug logging
-            logger.debug(f"Converting Routes response with {len(origins)} origins, {len(destinations)} destinations")
-            logger.debug(f"Routes response type: {type(routes_response)}")
+            logger.debug("Converting Routes response with %d origins, %d destinations", len(origins), len(destinations))
+            logger.debug("Routes response type: %s", type(routes_response))
+            
+            # Routes API response can be either a dict with "elements" or direct array
+            elements_list = routes_response.get("elements", routes_response) if isinstance(routes_response, dict) else routes_response
+            
+            # Index elements by (origin, destination) in one pass, keeping the first element for each pair
+            elements_by_pair = {}
+            if isinstance(elements_list, list):
+                for route_element in elements_list:
+                    elements_by_pair.setdefault(
+                        (route_element.get("originIndex"), route_element.get("destinationIndex")), route_element
+                    )
+            else:
+                logger.warning(f"Expected elements_list to be a list, got {type(elements_list)}: {elements_list}")
             
             # Create rows for each origin
             for origin_idx in range(len(origins)):
@@ -748,109 +967,105 @@ class NeighborhoodRecommendationService:
                     # Find the corresponding element in Routes API response
                     element = {"status": "NOT_FOUND"}
                     
-                    # Routes API response can be either a dict with "elements" or direct array
-                    elements_list = routes_response.get("elements", routes_response) if isinstance(routes_response, dict) else routes_response
-                    
-                    if isinstance(elements_list, list):
-                        for route_element in elements_list:
-                            if (route_element.get("originIndex") == origin_idx and 
-                                route_element.get("destinationIndex") == dest_idx):
-                                
-                                # Routes API v2 can use either condition field or status object
-                                condition = route_element.get("condition")
-                                status_obj = route_element.get("status", {})
-                                
-                                # Check different ways to determine if route is valid
-                                has_valid_route = False
-                                error_message = None
-                                
-                                # Method 1: Check condition field
-                                if condition:
-                                    valid_conditions = ["ROUTE_EXISTS", "OK"]
-                                    has_valid_route = condition in valid_conditions
-                                
-                                # Method 2: Check status object
-                                if not has_valid_route and isinstance(status_obj, dict):
-                                    if not status_obj:
-                                        # Empty status object means success
-                                        has_valid_route = True
-                                    elif "code" in status_obj:
-                                        # Status codes: 0 = OK, other codes are errors
-                                        status_code = status_obj.get("code", -1)
-                                        error_message = status_obj.get("message", "Unknown error")
-                                        
-                                        if status_code == 0:
-                                            has_valid_route = True
-                                        else:
-                                            # Log important errors only
-                                            if status_code == 5:
-                                                logger.warning(f"Place ID not found: {error_message}")
-                                            elif status_code == 3:
-                                                logger.warning(f"Invalid API request: {error_message}")
-                                
-                                if has_valid_route:
-                                    duration_seconds = None
-                                    distance_meters = None
-                                    
-                                    # Extract duration
-                                    if "duration" in route_element:
-                                        duration_str = route_element["duration"]
-                                        # Remove 's' suffix and convert to int
-                                        if duration_str.endswith('s'):
-                                            try:
-                                                duration_seconds = int(float(duration_str[:-1]))
-                                            except (ValueError, TypeError):
-                                                logger.warning(f"Could not parse duration: {duration_str}")
-                                                duration_seconds = None
-                                    
-                                    # Extract distance
-                                    if "distanceMeters" in route_element:
-                                        distance_meters = route_element["distanceMeters"]
-                                    
-                                    # For transit routes, accept routes even with 0 distance if duration > 0
-                                    # Transit routes sometimes return distance=0 but valid duration
-                                    is_transit_route = route_element.get("travelMode") == "TRANSIT" or "transitDuration" in route_element
-                                    
-                                    if duration_seconds is not None and duration_seconds > 0:
-                                        # Valid route if duration > 0, distance check depends on route type
-                                        if not is_transit_route and (distance_meters is None or distance_meters <= 0):
-                                            # Non-transit routes need distance
-                                            logger.debug(f"Non-transit route missing distance: {distance_meters}")
-                                            element = {"status": "ZERO_RESULTS"}
-                                        else:
-                                            # For transit routes, add realistic buffer to account for real-world delays
-                                            adjusted_duration = duration_seconds
-                                            if is_transit_route:
-                                                # Add modest buffer for transit delays and real-world conditions
-                                                # Since we now use realistic departure times and routing preferences,
-                                                # we need less artificial buffering
-                                                buffer_factor = 1.10  # 10% buffer for minor delays and rounding
-                                                adjusted_duration = int(duration_seconds * buffer_factor)
-                                                
-                                                logger.debug(f"Transit buffer adjustment: {duration_seconds}s -> {adjusted_duration}s (+{int((buffer_factor-1)*100)}%)")
-                                            
-                                            # Create successful response
-                                            element = {
-                                                "status": "OK",
-                                                "duration": {
-                                                    "text": f"{adjusted_duration // 60} mins" if adjusted_duration >= 60 else f"{adjusted_duration} secs",
-                                                    "value": adjusted_duration
-                                                },
-                                                "distance": {
-                                                    "text": f"{distance_meters / 1000:.1f} km" if distance_meters and distance_meters > 0 else "N/A",
-                                                    "value": distance_meters if distance_meters else 0
-                                                }
-                                            }
-                                            logger.debug(f"Successfully parsed route: {adjusted_duration}s (original: {duration_seconds}s), {distance_meters}m")
+                    route_element = elements_by_pair.get((origin_idx, dest_idx))
+                    if route_element is not None:
+                        # Routes API v2 can use either condition field or status object
+                        condition = route_element.get("condition")
+                        status_obj = route_element.get("status", {})
+                        
+                        # Check different ways to determine if route is valid
+                        has_valid_route = False
+                        error_message = None
+                        
+                        # Method 1: Check condition field
+                        if condition:
+                            valid_conditions = ["ROUTE_EXISTS", "OK"]
+                            has_valid_route = condition in valid_conditions
+                        
+                        # Method 2: Check status object
+                        if not has_valid_route and isinstance(status_obj, dict):
+                            if not status_obj:
+                                # Empty status object means success
+                                has_valid_route = True
+                            elif "code" in status_obj:
+                                # Status codes: 0 = OK, other codes are errors
+                                status_code = status_obj.get("code", -1)
+                                error_message = status_obj.get("message", "Unknown error")
+                        
+                                if status_code == 0:
+                                    has_valid_route = True
+                                else:
+                                    # Log important errors only
+                                    if status_code == 5:
+                                        logger.warning(f"Place ID not found: {error_message}")
+                                    elif status_code == 3:
+                                        logger.warning(f"Invalid API request: {error_message}")
+                        
+                        if has_valid_route:
+                            duration_seconds = None
+                            distance_meters = None
+                        
+                            # Extract duration
+                            if "duration" in route_element:
+                                duration_str = route_element["duration"]
+                                # Remove 's' suffix and convert to int
+                                if duration_str.endswith('s'):
+                                    seconds_str = duration_str[:-1]
+                                    if seconds_str.isdigit():
+                                        # Durations are whole seconds in practice
+                                        duration_seconds = int(seconds_str)
                                     else:
-                                        logger.debug(f"Invalid duration for route: {duration_seconds}")
-                                        element = {"status": "ZERO_RESULTS"}
+                                        try:
+                                            duration_seconds = int(float(seconds_str))
+                                        except (ValueError, TypeError):
+                                            logger.warning(f"Could not parse duration: {duration_str}")
+                                            duration_seconds = None
+                        
+                            # Extract distance
+                            if "distanceMeters" in route_element:
+                                distance_meters = route_element["distanceMeters"]
+                        
+                            # For transit routes, accept routes even with 0 distance if duration > 0
+                            # Transit routes sometimes return distance=0 but valid duration
+                            is_transit_route = route_element.get("travelMode") == "TRANSIT" or "transitDuration" in route_element
+                        
+                            if duration_seconds is not None and duration_seconds > 0:
+                                # Valid route if duration > 0, distance check depends on route type
+                                if not is_transit_route and (distance_meters is None or distance_meters <= 0):
+                                    # Non-transit routes need distance
+                                    logger.debug("Non-transit route missing distance: %s", distance_meters)
+                                    element = {"status": "ZERO_RESULTS"}
                                 else:
-                                    logger.debug(f"No valid route found for origin {origin_idx} to dest {dest_idx}: condition={condition}")
-                                    element = {"status": "NOT_FOUND"}
-                                break
-                    else:
-                        logger.warning(f"Expected elements_list to be a list, got {type(elements_list)}: {elements_list}")
+                                    # For transit routes, add realistic buffer to account for real-world delays
+                                    adjusted_duration = duration_seconds
+                                    if is_transit_route:
+                                        # Add modest buffer for transit delays and real-world conditions
+                                        # Since we now use realistic departure times and routing preferences,
+                                        # we need less artificial buffering
+                                        buffer_factor = 1.10  # 10% buffer for minor delays and rounding
+                                        adjusted_duration = int(duration_seconds * buffer_factor)
+                        
+                                        logger.debug("Transit buffer adjustment: %ss -> %ss (+%d%%)", duration_seconds, adjusted_duration, int((buffer_factor-1)*100))
+                        
+                                    # Create successful response
+                                    element = {
+                                        "status": "OK",
+                                        "duration": {
+                                            "text": f"{adjusted_duration // 60} mins" if adjusted_duration >= 60 else f"{adjusted_duration} secs",
+                                            "value": adjusted_duration
+                                        },
+                                        "distance": {
+                                            "text": f"{distance_meters / 1000:.1f} km" if distance_meters and distance_meters > 0 else "N/A",
+                                            "value": distance_meters if distance_meters else 0
+                                        }
+                                    }
+                                    logger.debug("Successfully parsed route: %ss (original: %ss), %sm", adjusted_duration, duration_seconds, distance_meters)
+                            else:
+                                logger.debug("Invalid duration for route: %s", duration_seconds)
+                                element = {"status": "ZERO_RESULTS"}
+                        else:
+                            logger.debug("No valid route found for origin %s to dest %s: condition=%s", origin_idx, dest_idx, condition)
+                            element = {"status": "NOT_FOUND"}
                     
                     row["elements"].append(element)
                 
@@ -862,12 +1077,12 @@ class NeighborhoodRecommendationService:
             logger.error(f"Error converting Routes API response: {e}")
             return {"status": "UNKNOWN_ERROR", "rows": []}
 
-    async def _get_location_scores(self, neighborhoods: List[Dict], user_pois: List[Dict]) -> Dict:
+    async def _get_location_scores(self, neighborhoods: NeighborhoodColumns, user_pois: List[Dict]) -> Dict:
         """
         Calculate location scores based on commute times to user POIs.
         
         Args:
-            neighborhoods: List of neighborhood data with coordinates
+            neighborhoods: Neighborhood columns, all of which have coordinates
             user_pois: List of user points of interest
             
         Returns:
@@ -884,42 +1099,36 @@ class NeighborhoodRecommendationService:
                     pois_by_mode[mode] = []
                 pois_by_mode[mode].append(poi)
             
-            # Get origins (neighborhood coordinates)
-            origins = []
-            neighborhood_id_to_index = {}
-            for i, neighborhood in enumerate(neighborhoods):
-                if neighborhood.get('latitude') and neighborhood.get('longitude'):
-                    origins.append({
-                        'lat': neighborhood['latitude'],
-                        'lng': neighborhood['longitude']
-                    })
-                    neighborhood_id_to_index[neighborhood['neighborhood_id']] = i
-                else:
-                    logger.warning(f"Neighborhood {neighborhood.get('neighborhood_id')} missing coordinates: lat={neighborhood.get('latitude')}, lng={neighborhood.get('longitude')}")
+            # Get origins (neighborhood coordinates); neighborhoods without coordinates are never loaded,
+            # and the list is shared by every request served from the same cached columns
+            origins = neighborhoods.origins
             
-            logger.info(f"Found {len(origins)} neighborhoods with coordinates out of {len(neighborhoods)} total neighborhoods")
+            logger.info(f"Found {len(origins)} neighborhoods with coordinates")
             
             if not origins:
                 logger.warning("No neighborhood coordinates found for distance matrix calculation")
                 return {}
             
-            # Calculate scores for each travel mode
-            all_results = {}
-            
+            # Log the destinations requested for each travel mode
             for mode, pois in pois_by_mode.items():
-                if not pois:
-                    continue
-                
-                destinations = [poi['place_id'] for poi in pois]
-                logger.info(f"Processing {len(destinations)} destinations for mode {mode}")
+                logger.info(f"Processing {len(pois)} destinations for mode {mode}")
                 
                 # Log POI details for debugging
-                for poi in pois:
-                    logger.info(f"POI: place_id={poi['place_id']}, description={poi.get('description', 'N/A')}, max_time={poi['max_time']} min, mode={poi['mode']}")
-                
-                # Call Google Routes API
-                data = self._call_google_routes_api(origins, destinations, mode)
-                
+                if logger.isEnabledFor(logging.DEBUG):
+                    for poi in pois:
+                        logger.debug("POI: place_id=%s, description=%s, max_time=%s min, mode=%s",
+                                     poi['place_id'], poi.get('description', 'N/A'), poi['max_time'], poi['mode'])
+            
+            # Request one route matrix per travel mode, all modes concurrently
+            route_matrices = await asyncio.gather(*(
+                self._get_route_matrix(origins, [poi['place_id'] for poi in pois], mode)
+                for mode, pois in pois_by_mode.items()
+            ))
+            
+            # Calculate scores for each travel mode
+            all_results = {}
+            
+            for (mode, pois), data in zip(pois_by_mode.items(), route_matrices):
                 if data:
                     all_results[mode] = {
                         'data': data,
@@ -942,75 +1151,68 @@ class NeighborhoodRecommendationService:
                 
                 return {}
             
-            # Process results and calculate scores
-            for neighborhood in neighborhoods:
-                neighborhood_id = neighborhood['neighborhood_id']
-                if neighborhood_id not in neighborhood_id_to_index:
-                    continue
+            # Score each mode's (neighborhoods x POIs) travel times in one pass; detail strings
+            # keep the mode and POI order
+            num_neighborhoods = len(neighborhoods)
+            score_sums = np.zeros(num_neighborhoods)
+            score_counts = np.zeros(num_neighborhoods, dtype=int)
+            location_details = [[] for _ in range(num_neighborhoods)]
+            
+            for mode, result_data in all_results.items():
+                pois = result_data['pois']
+                rows = result_data['data'].get('rows', [])[:num_neighborhoods]
+                mode_display = mode.replace('_', ' ').replace('public transport', 'transit').lower()
                 
-                neighborhood_index = neighborhood_id_to_index[neighborhood_id]
-                poi_scores = []
-                location_details = []
+                # Travel seconds per (neighborhood, POI), NaN where no route was found
+                durations = np.full((num_neighborhoods, len(pois)), np.nan)
+                has_element = np.zeros((num_neighborhoods, len(pois)), dtype=bool)
                 
-                for mode, result_data in all_results.items():
-                    data = result_data['data']
-                    pois = result_data['pois']
-                    
-                    if 'rows' in data and len(data['rows']) > neighborhood_index:
-                        row = data['rows'][neighborhood_index]
-                        elements = row.get('elements', [])
+                for neighborhood_index, row in enumerate(rows):
+                    details = location_details[neighborhood_index]
+                    for poi_index, (element, poi) in enumerate(zip(row.get('elements', []), pois)):
+                        has_element[neighborhood_index, poi_index] = True
+                        has_route = element.get('status') == 'OK' and 'duration' in element
+                        if has_route:
+                            durations[neighborhood_index, poi_index] = element['duration']['value']
                         
-                        for poi_index, element in enumerate(elements):
-                            if poi_index >= len(pois):
-                                continue
-                                
-                            poi = pois[poi_index]
-                            
-                            if element.get('status') == 'OK' and 'duration' in element:
-                                # Extract travel time in minutes
-                                duration_seconds = element['duration']['value']
-                                travel_time_minutes = duration_seconds / 60
-                                max_time = poi['max_time']
-                                
-                                # Calculate score based on travel time vs max time
-                                if travel_time_minutes <= max_time:
-                                    score = 1.0
-                                else:
-                                    # Penalize based on how much over the limit
-                                    excess_ratio = (travel_time_minutes - max_time) / max_time
-                                    score = max(0.0, 1.0 - excess_ratio)
-                                
-                                poi_scores.append(score)
-                                
-                                # Create detail string
-                                mode_display = mode.replace('_', ' ').replace('public transport', 'transit').title()
-                                location_details.append(
-                                    f"{int(travel_time_minutes)} min by {mode_display.lower()} to {poi.get('description', 'location')}"
-                                )
-                                
+                        # Only the first few details are returned, so later ones are never formatted
+                        if len(details) >= LOCATION_DETAILS_LIMIT:
+                            continue
+                        
+                        poi_description = poi.get('description', 'location')
+                        if has_route:
+                            details.append(f"{int(element['duration']['value'] / 60)} min by {mode_display} to {poi_description}")
+                        else:
+                            # If no route found or error, provide a more helpful message
+                            element_status = element.get('status', 'UNKNOWN')
+                            if element_status == 'ZERO_RESULTS':
+                                details.append(f"No {mode_display} route found to {poi_description}")
+                            elif element_status == 'NOT_FOUND':
+                                details.append(f"Location not accessible by {mode_display}: {poi_description}")
                             else:
-                                # If no route found or error, give neutral score but provide more helpful message
-                                poi_scores.append(0.3)
-                                element_status = element.get('status', 'UNKNOWN')
-                                mode_display = mode.replace('_', ' ').replace('public transport', 'transit').title()
-                                poi_description = poi.get('description', 'location')
-                                
-                                if element_status == 'ZERO_RESULTS':
-                                    location_details.append(f"No {mode_display.lower()} route found to {poi_description}")
-                                elif element_status == 'NOT_FOUND':
-                                    location_details.append(f"Location not accessible by {mode_display.lower()}: {poi_description}")
-                                else:
-                                    location_details.append(f"Route to {poi_description} unavailable ({mode_display.lower()})")
-                
-                # Calculate final location score as average of all POI scores
-                if poi_scores:
-                    final_score = sum(poi_scores) / len(poi_scores)
-                else:
-                    final_score = 0.5  # Neutral score if no POI data
+                                details.append(f"Route to {poi_description} unavailable ({mode_display})")
                 
+                # Full score within the max time, penalized by how much the limit is exceeded,
+                # and a neutral score where there is no route
+                travel_minutes = durations / 60
+                max_times = np.array([poi['max_time'] for poi in pois], dtype=float)
+                poi_scores = np.where(
+                    travel_minutes <= max_times,
+                    1.0,
+                    np.maximum(0.0, 1.0 - (travel_minutes - max_times) / max_times)
+                )
+                poi_scores[np.isnan(durations)] = 0.3
+                score_sums += np.where(has_element, poi_scores, 0.0).sum(axis=1)
+                score_counts += has_element.sum(axis=1)
+            
+            # Calculate final location score as average of all POI scores, neutral if no POI data
+            final_scores = np.full(num_neighborhoods, 0.5)
+            np.divide(score_sums, score_counts, out=final_scores, where=score_counts > 0)
+            
+            for neighborhood_id, final_score, details in zip(neighborhoods.ids.tolist(), final_scores.tolist(), location_details):
                 location_scores[neighborhood_id] = {
                     'score': final_score,
-                    'details': location_details[:3]  # Limit to top 3 details
+                    'details': details
                 }
             
             logger.info(f"Calculated location scores for {len(location_scores)} neighborhoods")
@@ -1023,23 +1225,21 @@ class NeighborhoodRecommendationService:
         
     def _score_neighborhoods(
         self, 
-        neighborhoods: List[Dict], 
+        neighborhoods: NeighborhoodColumns, 
         user_preferences: np.ndarray, 
         user_price_range: Optional[Dict],
-        location_scores: Optional[Dict] = None
+        location_scores: Optional[Dict] = None,
+        top_k: Optional[int] = None,
+        feature_scores: Optional[np.ndarray] = None
     ) -> List[Dict]:
-        """Enhanced scoring that combines feature matching with price affordability."""
+        """
+        Enhanced scoring that combines feature matching with price affordability.
+        Returns the top_k neighborhoods (all if None) ordered by total score.
+        feature_scores may be passed in when already computed for these preferences, e.g. by a batch.
+        """
         scored_neighborhoods = []
         
-        # Ensure user preferences are valid
-        if np.sum(user_preferences) == 0 or np.any(np.isnan(user_preferences)):
-            # Use default balanced preferences if user preferences are invalid
-            user_preferences = np.full(len(self.feature_names), 0.5)
-            logger.warning("Invalid user preferences detected, using default balanced preferences")
-        
-        # Keep original preferences for realistic weighting (don't normalize to sum=1)
-        # Just ensure they're in 0-1 range
-        user_preferences = np.clip(user_preferences, 0, 1)
+        user_preferences = self._sanitize_preferences(user_preferences)
         
         # Weights for balancing feature score, price score, and location score
         if location_scores:
@@ -1051,92 +1251,113 @@ class NeighborhoodRecommendationService:
             price_weight = 0.3     # 30% price affordability
             location_weight = 0.0  # 0% location scoring
         
-        for neighborhood in neighborhoods:
-            # Ensure feature vector is valid
-            feature_vector = neighborhood.get('feature_vector', [])
-            if len(feature_vector) == 0 or len(feature_vector) != len(user_preferences):
-                # Create default feature vector if missing
-                feature_vector = [0.5] * len(user_preferences)
-                logger.warning(f"Invalid feature vector for neighborhood {neighborhood.get('neighborhood_id')}, using default")
-            
-            # Convert to numpy array and ensure no NaN values
-            feature_vector = np.array(feature_vector)
-            if np.any(np.isnan(feature_vector)):
-                feature_vector = np.nan_to_num(feature_vector, nan=0.5)
-            
-            # Calculate realistic feature matching score
-            # Use weighted average of how well each feature matches user preference
-            feature_matches = []
-            total_weight = 0
-            
-            for i, (neighborhood_val, user_pref) in enumerate(zip(feature_vector, user_preferences)):
-                # Calculate match quality: 1.0 - |difference| gives us similarity
-                match_quality = 1.0 - abs(neighborhood_val - user_pref)
-                # Weight by user preference strength (higher pref = more important match)
-                weight = user_pref if user_pref > 0.1 else 0.1  # Minimum weight to avoid zero
-                feature_matches.append(match_quality * weight)
-                total_weight += weight
-            
-            # Calculate weighted average match score
-            if total_weight > 0:
-                feature_score = sum(feature_matches) / total_weight
-            else:
-                feature_score = 0.5
-            
-            # Scale to make scores more meaningful (typically will be 0.7-1.0 range naturally)
-            # Add slight boost to make good matches feel rewarding
-            # feature_score = feature_score * 1.1  # Boost by 10%
-            # feature_score = min(1.0, feature_score)  # Cap at 100%
-            
-            # Ensure feature score is valid
-            if np.isnan(feature_score) or np.isinf(feature_score):
-                feature_score = 0.5  # Default to 50% - neutral match
-                logger.warning(f"Invalid feature score for neighborhood {neighborhood.get('neighborhood_id')}, using default")
-            
-            # Calculate price affordability score
-            price_score = 1.0  # Default if no price range provided
-            if user_price_range:
-                price_score = self._calculate_price_affordability_score(
-                    neighborhood['avg_rental_price'], 
-                    user_price_range
-                )
-            
-            # Get location score for this neighborhood
-            location_score = 0.5  # Default neutral score
-            location_details = []
-            if location_scores and neighborhood['neighborhood_id'] in location_scores:
-                location_data = location_scores[neighborhood['neighborhood_id']]
-                location_score = location_data['score']
-                location_details = location_data['details']
-            
-            # Combined total score
-            total_score = (feature_score * feature_weight) + (price_score * price_weight) + (location_score * location_weight)
-            
-            # Ensure total score is valid
-            if np.isnan(total_score) or np.isinf(total_score):
-                total_score = 0.5  # Default to 50% - neutral score
-                logger.warning(f"Invalid total score for neighborhood {neighborhood.get('neighborhood_id')}, using default")
-            
+        # Score every neighborhood's features in one pass over the (N, features) matrix
+        feature_matrix = neighborhoods.features
+        neighborhood_ids = neighborhoods.ids.tolist()
+        
+        # Match quality (1 - |difference|) weighted by user preference strength,
+        # with a minimum weight to avoid zero
+        if feature_scores is None:
+            weights = np.maximum(user_preferences, 0.1)
+            feature_scores = _feature_match_scores(feature_matrix, user_preferences, weights)
+        
+        # Ensure feature scores are valid
+        invalid_features = ~np.isfinite(feature_scores)
+        if invalid_features.any():
+            feature_scores[invalid_features] = 0.5  # Default to 50% - neutral match
+            logger.warning("Invalid feature score for %d neighborhoods, using default", int(invalid_features.sum()))
+        
+        # Calculate price affordability scores (default 1.0 if no price range provided)
+        if user_price_range:
+            price_scores = self._calculate_price_affordability_scores(neighborhoods.avg_rental_prices, user_price_range)
+        else:
+            price_scores = np.ones(len(neighborhoods), dtype=np.float32)
+        
+        # Get location scores, defaulting to a neutral score
+        location_scores = location_scores or {}
+        location_values = np.array(
+            [location_scores[neighborhood_id]['score'] if neighborhood_id in location_scores else 0.5
+             for neighborhood_id in neighborhood_ids],
+            dtype=np.float32
+        )
+        
+        # Combined total score
+        total_scores = (feature_scores * feature_weight) + (price_scores * price_weight) + (location_values * location_weight)
+        
+        # Ensure total scores are valid
+        invalid_totals = ~np.isfinite(total_scores)
+        if invalid_totals.any():
+            total_scores[invalid_totals] = 0.5  # Default to 50% - neutral score
+            logger.warning("Invalid total score for %d neighborhoods, using default", int(invalid_totals.sum()))
+        
+        # Build result rows only for the selected neighborhoods
+        for row in self._top_k_indices(total_scores, top_k):
+            avg_rental_price = neighborhoods.avg_rental_prices[row]
+            avg_rental_price = None if np.isnan(avg_rental_price) else float(avg_rental_price)
+            neighborhood_scores = neighborhoods.individual_scores[row]
+            individual_scores = dict(zip(FEATURE_NAMES, _nan_to_none(neighborhood_scores.tolist())))
             scored_neighborhoods.append({
-                'neighborhood_id': neighborhood['neighborhood_id'],
-                'hebrew_name': neighborhood['hebrew_name'],
-                'feature_score': float(feature_score),
-                'price_score': float(price_score),
-                'location_score': float(location_score),
-                'location_details': location_details,
-                'total_score': float(total_score),
-                'avg_rental_price': neighborhood['avg_rental_price'],
-                'individual_scores': neighborhood['individual_scores'],
-                'user_preferences': user_preferences.tolist(),  # Keep original for debugging
-                'match_details': self._get_match_details(neighborhood['individual_scores'], user_preferences),
+                'neighborhood_id': neighborhood_ids[row],
+                'hebrew_name': neighborhoods.hebrew_names[row],
+                'feature_score': float(feature_scores[row]),
+                'price_score': float(price_scores[row]),
+                'location_score': float(location_values[row]),
+                'location_details': location_scores[neighborhood_ids[row]]['details'] if neighborhood_ids[row] in location_scores else [],
+                'total_score': float(total_scores[row]),
+                'avg_rental_price': avg_rental_price,
+                'individual_scores': individual_scores,
+                'match_details': self._get_match_details(neighborhood_scores, user_preferences),
                 'price_analysis': self._get_price_analysis(
-                    neighborhood['avg_rental_price'], 
+                    avg_rental_price, 
                     user_price_range
                 ) if user_price_range else None
             })
         
         return scored_neighborhoods
     
+    def _sanitize_preferences(self, user_preferences: np.ndarray) -> np.ndarray:
+        """Replace invalid preferences with balanced defaults and clip them to the 0-1 range."""
+        # A single sum is NaN if any element is NaN
+        preference_sum = float(user_preferences.sum())
+        if preference_sum == 0 or math.isnan(preference_sum):
+            # Use default balanced preferences if user preferences are invalid
+            user_preferences = np.full(len(FEATURE_NAMES), 0.5)
+            logger.warning("Invalid user preferences detected, using default balanced preferences")
+        
+        # Keep original preferences for realistic weighting (don't normalize to sum=1)
+        # Just ensure they're in 0-1 range
+        return np.clip(user_preferences, 0, 1)
+    
+    def _top_k_indices(self, scores: np.ndarray, top_k: Optional[int]) -> np.ndarray:
+        """Indices of the top_k scores, highest first, with ties kept in their original order."""
+        if top_k is None or top_k >= scores.size:
+            return np.argsort(-scores, kind='stable')
+        if top_k <= 0:
+            return np.array([], dtype=int)
+        
+        # Partition to find the k-th best score, then sort only the candidates at or above it
+        threshold = scores[np.argpartition(-scores, top_k - 1)[top_k - 1]]
+        candidates = np.flatnonzero(scores >= threshold)
+        return candidates[np.argsort(-scores[candidates], kind='stable')][:top_k]
+    
+    def _stack_feature_vectors(self, neighborhood_ids: List[int], feature_vectors: List[List[float]], num_features: int) -> np.ndarray:
+        """Stack feature vectors into a contiguous float32 (N, num_features) matrix with NaNs set to neutral."""
+        feature_matrix = np.full((len(feature_vectors), num_features), 0.5, dtype=np.float32)
+        
+        invalid_ids = []
+        for row, feature_vector in enumerate(feature_vectors):
+            if len(feature_vector) != num_features:
+                # Keep the default feature vector if missing
+                invalid_ids.append(neighborhood_ids[row])
+                continue
+            feature_matrix[row] = feature_vector
+        if invalid_ids:
+            logger.warning("Invalid feature vectors for %d neighborhoods, using default: %s",
+                           len(invalid_ids), invalid_ids[:10])
+        
+        feature_matrix[np.isnan(feature_matrix)] = 0.5
+        return feature_matrix
+    
     def _get_price_analysis(self, avg_rental_price: Optional[float], user_price_range: Dict) -> Dict:
         """Get detailed price analysis for explanation."""
         if not avg_rental_price:
@@ -1150,7 +1371,7 @@ class NeighborhoodRecommendationService:
         user_max = user_price_range['price_max']
         
         # Add debug logging to track price analysis
-        logger.debug(f"Price analysis: rental_price={avg_rental_price}, user_range={user_min}-{user_max}")
+        logger.debug("Price analysis: rental_price=%s, user_range=%s-%s", avg_rental_price, user_min, user_max)
         
         # Buffer zone (20% above/below user range)
         buffer_percentage = 0.2
@@ -1208,32 +1429,31 @@ class NeighborhoodRecommendationService:
                     'excess_percentage': round(excess_percentage, 1)
                 }
     
-    def _get_match_details(self, neighborhood_scores: Dict, user_preferences: np.ndarray) -> Dict:
-        """Get detailed match information for explanation."""
-        match_details = {}
-        
-        for i, feature_name in enumerate(self.feature_names):
-            neighborhood_score = neighborhood_scores.get(feature_name, 0.5)
-            user_preference = user_preferences[i]
-            
-            # Calculate how well this feature matches user preference
-            if user_preference > 0.7:  # User considers this very important
-                if neighborhood_score and neighborhood_score > 0.6:
-                    match_quality = "excellent"
-                elif neighborhood_score and neighborhood_score > 0.4:
-                    match_quality = "good"
-                else:
-                    match_quality = "poor"
-            else:
-                match_quality = "neutral"
-            
-            match_details[feature_name] = {
+    def _get_match_details(self, neighborhood_scores: np.ndarray, user_preferences: np.ndarray) -> Dict:
+        """
+        Get detailed match information for explanation.
+        
+        Args:
+            neighborhood_scores: Per-feature levels aligned with FEATURE_NAMES, NaN where missing
+            user_preferences: User preference vector
+        """
+        # Missing scores are NaN, which fails both thresholds and rates as "poor"
+        # Only features the user considers very important (> 0.7) are rated
+        match_qualities = np.select(
+            [user_preferences <= 0.7, neighborhood_scores > 0.6, neighborhood_scores > 0.4],
+            ['neutral', 'excellent', 'good'],
+            default='poor'
+        )
+        
+        return {
+            feature_name: {
                 'neighborhood_score': neighborhood_score,
-                'user_importance': float(user_preference),
+                'user_importance': user_importance,
                 'match_quality': match_quality
             }
-        
-        return match_details
+            for feature_name, neighborhood_score, user_importance, match_quality
+            in zip(FEATURE_NAMES, _nan_to_none(neighborhood_scores.tolist()), user_preferences.tolist(), match_qualities.tolist())
+        }
     
     async def _enrich_recommendations(
         self, 
@@ -1243,15 +1463,13 @@ class NeighborhoodRecommendationService:
         """Enrich recommendations with listings and additional info."""
         enriched_recommendations = []
         
+        # Fetch info and listing counts for all neighborhoods in a single round trip
+        neighborhood_ids = [neighborhood['neighborhood_id'] for neighborhood in neighborhoods]
+        neighborhoods_info, listing_counts = await self._get_neighborhoods_info(db, neighborhood_ids)
+        
         for neighborhood in neighborhoods:
             try:
-                # Get neighborhood info
-                neighborhood_info = await self._get_neighborhood_info(db, neighborhood['neighborhood_id'])
-                
-                # Count total available listings
-                total_listings = await self._count_available_listings(
-                    db, neighborhood['neighborhood_id']
-                )
+                neighborhood_info = neighborhoods_info.get(neighborhood['neighborhood_id'])
                 
                 enriched_recommendations.append({
                     'neighborhood_id': neighborhood['neighborhood_id'],
@@ -1267,7 +1485,7 @@ class NeighborhoodRecommendationService:
                     'price_analysis': neighborhood.get('price_analysis'),
                     'match_details': neighborhood['match_details'],
                     'individual_scores': neighborhood['individual_scores'],
-                    'total_available_listings': total_listings,
+                    'total_available_listings': listing_counts.get(neighborhood['neighborhood_id'], 0),
                     'neighborhood_info': neighborhood_info
                 })
                 
@@ -1277,87 +1495,159 @@ class NeighborhoodRecommendationService:
         
         return enriched_recommendations
     
-    async def _get_neighborhood_info(self, db: AsyncSession, neighborhood_id: int) -> Optional[Dict]:
-        """Get additional neighborhood information."""
-        try:
-            result = await db.execute(
-                select(Neighborhood)
-                .options(
-                    selectinload(Neighborhood.metrics),
-                    selectinload(Neighborhood.meta_data)
-                )
-                .where(Neighborhood.id == neighborhood_id)
-            )
-            neighborhood = result.scalar_one_or_none()
-            
-            if neighborhood:
-                return {
-                    'english_name': neighborhood.english_name,
-                    'avg_rent_price': float(neighborhood.metrics.avg_rental_price) if neighborhood.metrics and neighborhood.metrics.avg_rental_price else None,
-                    'avg_purchase_price': float(neighborhood.metrics.avg_sale_price) if neighborhood.metrics and neighborhood.metrics.avg_sale_price else None,
-                    'overview': neighborhood.meta_data.overview if neighborhood.meta_data else None,
-                    'latitude': neighborhood.latitude,
-                    'longitude': neighborhood.longitude
-                }
-            
-            return None
-            
-        except Exception as e:
-            logger.error(f"Error fetching neighborhood info for {neighborhood_id}: {e}")
-            return None
-    
-    async def _count_available_listings(
+    async def _get_neighborhoods_info(
         self, 
         db: AsyncSession, 
-        neighborhood_id: int, 
-    ) -> int:
-        """Count total available listings for a neighborhood."""
+        neighborhood_ids: List[int], 
+    ) -> Tuple[Dict[int, Dict], Dict[int, int]]:
+        """
+        Get additional information and available listing counts for several neighborhoods.
+        
+        Entries are shared by all users, so they are read through a short-lived Redis cache
+        and only the missing neighborhoods are loaded, in one query.
+        
+        Returns:
+            (info keyed by neighborhood id, active listing count keyed by neighborhood id)
+        """
+        if not neighborhood_ids:
+            return {}, {}
+        
+        neighborhoods_info = {}
+        available_listings = {}
+        cache_keys = [_neighborhood_enrichment_cache_key(neighborhood_id) for neighborhood_id in neighborhood_ids]
+        missing_ids = []
+        for neighborhood_id, cached in zip(neighborhood_ids, get_many_cache(cache_keys)):
+            if cached is None:
+                missing_ids.append(neighborhood_id)
+            else:
+                neighborhoods_info[neighborhood_id] = cached['info']
+                available_listings[neighborhood_id] = cached['available_listings']
+        if not missing_ids:
+            return neighborhoods_info, available_listings
+        
         try:
-            query = select(func.count(Listing.listing_id)).join(
-                ListingMetadata, Listing.listing_id == ListingMetadata.listing_id
-            ).join(
-                Neighborhood, ListingMetadata.neighborhood_id == Neighborhood.id
+            # Every metadata row belongs to a listing (its primary key is the listing FK),
+            # so the count is taken from listing_metadata alone
+            listing_counts = select(
+                ListingMetadata.neighborhood_id,
+                func.count().label('listing_count')
             ).where(
                 and_(
-                    Neighborhood.id == neighborhood_id,
+                    ListingMetadata.neighborhood_id.in_(missing_ids),
                     ListingMetadata.is_active == True
                 )
-            )
+            ).group_by(ListingMetadata.neighborhood_id).subquery()
+            
+            query = select(
+                Neighborhood.id,
+                Neighborhood.english_name,
+                Neighborhood.latitude,
+                Neighborhood.longitude,
+                cast(NeighborhoodMetrics.avg_rental_price, Float).label('avg_rental_price'),
+                cast(NeighborhoodMetrics.avg_sale_price, Float).label('avg_sale_price'),
+                NeighborhoodMetadata.overview,
+                listing_counts.c.listing_count
+            ).outerjoin(
+                NeighborhoodMetrics, Neighborhood.id == NeighborhoodMetrics.neighborhood_id
+            ).outerjoin(
+                NeighborhoodMetadata, Neighborhood.id == NeighborhoodMetadata.neighborhood_id
+            ).outerjoin(
+                listing_counts, Neighborhood.id == listing_counts.c.neighborhood_id
+            ).where(Neighborhood.id.in_(missing_ids))
             
             result = await db.execute(query)
-            count = result.scalar()
-            return count or 0
+            
+            for (neighborhood_id, english_name, latitude, longitude,
+                 avg_rental_price, avg_sale_price, overview, listing_count) in result.all():
+                neighborhoods_info[neighborhood_id] = {
+                    'english_name': english_name,
+                    'avg_rent_price': avg_rental_price or None,
+                    'avg_purchase_price': avg_sale_price or None,
+                    'overview': overview,
+                    'latitude': latitude,
+                    'longitude': longitude
+                }
+                available_listings[neighborhood_id] = listing_count or 0
+            
+            set_many_cache(
+                {
+                    _neighborhood_enrichment_cache_key(neighborhood_id): {
+                        'info': neighborhoods_info[neighborhood_id],
+                        'available_listings': available_listings[neighborhood_id]
+                    }
+                    for neighborhood_id in missing_ids if neighborhood_id in neighborhoods_info
+                },
+                ttl=NEIGHBORHOOD_ENRICHMENT_CACHE_TTL_SECONDS
+            )
+            return neighborhoods_info, available_listings
             
         except Exception as e:
-            logger.error(f"Error counting listings for neighborhood {neighborhood_id}: {e}")
-            return 0
+            logger.error(f"Error fetching neighborhood info for {missing_ids}: {e}")
+            return neighborhoods_info, available_listings
 
     async def _get_cached_preference_vector(self, db: AsyncSession, user_id: str) -> Optional[np.ndarray]:
         """
-        Get cached user preference vector from PostgreSQL.
+        Get cached user preference vector, from the in-process cache or PostgreSQL.
         
         Args:
             db: Database session
             user_id: User's Firebase UID
             
         Returns:
-            Preference vector as numpy array, or None if not found
+            Read-only preference vector, or None if not found
         """
+        preference_vector = get_cached_preference_vector(user_id)
+        if preference_vector is not None:
+            return preference_vector
+        
         try:
-            result = await db.execute(
-                select(UserPreferenceVector).where(UserPreferenceVector.user_id == user_id)
-            )
-            cached_vector = result.scalar_one_or_none()
-            
-            if cached_vector and cached_vector.preference_vector:
-                return np.array(cached_vector.preference_vector)
+            # Read the float8[] values rather than the packed float32 copy: the preferences are
+            # shown to users as match_details importances and must keep their exact values
+            result = await db.execute(lambda_stmt(
+                lambda: select(UserPreferenceVector.preference_vector).where(UserPreferenceVector.user_id == user_id)
+            ))
+            preference_vector = result.scalar_one_or_none()
+            if not preference_vector:
+                return None
             
-            return None
+            return cache_preference_vector(user_id, preference_vector)
             
         except Exception as e:
             logger.error(f"Error fetching cached preference vector for user {user_id}: {e}")
             return None
 
+    async def _get_cached_preference_vectors(self, db: AsyncSession, user_ids: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Get several users' stored preference vectors, reading the in-process cache first
+        and the rest from PostgreSQL in one query.
+        
+        Returns:
+            Read-only preference vectors keyed by user id; users without one are omitted
+        """
+        preference_vectors = {}
+        missing_ids = []
+        for user_id in user_ids:
+            preference_vector = get_cached_preference_vector(user_id)
+            if preference_vector is None:
+                missing_ids.append(user_id)
+            else:
+                preference_vectors[user_id] = preference_vector
+        if not missing_ids:
+            return preference_vectors
+        
+        try:
+            # Exact float8[] values, as in _get_cached_preference_vector
+            result = await db.execute(
+                select(UserPreferenceVector.user_id, UserPreferenceVector.preference_vector)
+                .where(UserPreferenceVector.user_id.in_(missing_ids))
+            )
+            for user_id, preference_vector in result.all():
+                if preference_vector:
+                    preference_vectors[user_id] = cache_preference_vector(user_id, preference_vector)
+        except Exception as e:
+            logger.error(f"Error fetching cached preference vectors for {len(missing_ids)} users: {e}")
+        return preference_vectors
+
 # Convenience function for direct usage
 async def get_user_neighborhood_recommendations(
     db: AsyncSession, 
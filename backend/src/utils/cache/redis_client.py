@@ -2,7 +2,7 @@
 import os
 import json
 import logging
-from typing import Optional, Any, Dict
+from typing import Optional, Any, Dict, List
 import redis
 from dotenv import load_dotenv
 from collections import deque
@@ -124,6 +124,51 @@ def set_cache(key: str, value: Dict[str, Any], ttl: int = CACHE_TTL) -> bool:
         logger.error(f"Error setting Redis cache: {e}", exc_info=True)
         return False
 
+def get_many_cache(keys: List[str]) -> List[Optional[Dict[str, Any]]]:
+    """
+    Get several values from Redis cache in one round trip.
+    
+    Args:
+        keys: The cache keys to retrieve
+        
+    Returns:
+        The cached values in key order, with None for missing keys (all None on error)
+    """
+    client = _get_redis_client()
+    if not client or not keys:
+        return [None] * len(keys)
+        
+    try:
+        return [json.loads(value) if value else None for value in client.mget(keys)]
+    except Exception as e:
+        logger.error(f"Error retrieving from Redis cache: {e}")
+        return [None] * len(keys)
+
+def set_many_cache(values: Dict[str, Dict[str, Any]], ttl: int = CACHE_TTL) -> bool:
+    """
+    Set several values in Redis cache in one pipelined round trip.
+    
+    Args:
+        values: Mapping of cache key to value (each JSON serialized)
+        ttl: Time to live in seconds
+        
+    Returns:
+        True if successful, False otherwise
+    """
+    client = _get_redis_client()
+    if not client or not values:
+        return False
+        
+    try:
+        pipeline = client.pipeline(transaction=False)
+        for key, value in values.items():
+            pipeline.set(key, json.dumps(value, cls=CustomJSONEncoder), ex=ttl)
+        pipeline.execute()
+        return True
+    except Exception as e:
+        logger.error(f"Error setting Redis cache: {e}", exc_info=True)
+        return False
+
 def delete_cache(key: str) -> bool:
     """
     Delete a value from Redis cache.
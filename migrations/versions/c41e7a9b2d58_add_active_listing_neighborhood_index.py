@@ -0,0 +1,34 @@
+"""add_active_listing_neighborhood_index
+
+Revision ID: c41e7a9b2d58
+Revises: 819615074b15
+Create Date: 2026-10-17 12:03:44.518260
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41e7a9b2d58'
+down_revision: Union[str, None] = '819615074b15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema - Index active listings by neighborhood for listing counts."""
+    op.create_index(
+        'ix_listing_metadata_active_neighborhood_id',
+        'listing_metadata',
+        ['neighborhood_id'],
+        unique=False,
+        postgresql_where=sa.text('is_active')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema - Remove the active listings by neighborhood index."""
+    op.drop_index('ix_listing_metadata_active_neighborhood_id', table_name='listing_metadata')